@@ -0,0 +1,66 @@
+"""
+Compares the grid sampling in triangulate_polygon against the original
+point-by-point loop on a ~100k m2 rough polygon.
+
+  python benchmarks/interior_sampling.py [--spacing 0.8]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from shapely.geometry import Point, Polygon
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from lib.mesh import densify_polygon, sample_interior_points
+
+
+def rough_polygon(area=100000.0, wobble=0.15, lobes=7):
+  # Irregular blob with a bunker-sized hole, scaled to the requested area
+  angles = np.linspace(0, 2 * math.pi, 720, endpoint=False)
+  radii = 1.0 + wobble * np.sin(lobes * angles) + (wobble / 2) * np.cos(3 * angles)
+  shell = np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+  hole = np.array(Point(0.3, 0.2).buffer(0.12).exterior.coords)
+  poly = Polygon(shell, holes=[hole])
+  scale = math.sqrt(area / poly.area)
+  return Polygon(shell * scale + 500, holes=[hole * scale + 500])
+
+
+def sample_interior_points_loop(poly, interior_spacing):
+  minx, miny, maxx, maxy = poly.bounds
+  x_points = np.arange(minx + interior_spacing, maxx, interior_spacing)
+  y_points = np.arange(miny + interior_spacing, maxy, interior_spacing)
+  interior_points = []
+  for x in x_points:
+    for y in y_points:
+      if poly.contains(Point(x, y)):
+        interior_points.append([x, y])
+  return np.array(interior_points)
+
+
+def timed(fn, *args):
+  start = time.perf_counter()
+  result = fn(*args)
+  return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--spacing", type=float, default=0.8, help="interior grid spacing (rough uses 0.8)")
+  parser.add_argument("--area", type=float, default=100000.0, help="polygon area in m2")
+  args = parser.parse_args()
+
+  poly = densify_polygon(rough_polygon(args.area), 0.5)
+  print(f"polygon area: {poly.area:.0f} m2, spacing: {args.spacing}")
+
+  loop_points, loop_time = timed(sample_interior_points_loop, poly, args.spacing)
+  batch_points, batch_time = timed(sample_interior_points, poly, args.spacing)
+
+  assert np.array_equal(loop_points, batch_points), "batched sampling produced different points"
+
+  print(f"  loop:    {loop_time:8.3f}s ({len(loop_points)} points)")
+  print(f"  batched: {batch_time:8.3f}s ({len(batch_points)} points)")
+  print(f"  speedup: {loop_time / batch_time:8.1f}x")
@@ -0,0 +1,188 @@
+"""
+Times every stage of mesh generation (SVG parsing, path sampling,
+subtraction, terrain reading, triangulation, height conforming and export)
+and the whole pipeline on synthetic courses of several sizes.
+
+  python benchmarks/suite.py [--scales small medium] [--output results.json]
+  python benchmarks/suite.py --baseline results.json [--threshold 0.2]
+
+Each stage keeps its fastest of --repeat runs. Results are written as JSON so
+runs can be compared: with --baseline, stages that got slower by more than
+--threshold are listed and the exit status is 1.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from lib.pipeline import job_folder, run_job, MESHERS
+from lib.report import RunReport
+from lib.svg import svg_parse
+from synthetic import write_course_svg, write_raw_terrain
+
+# bump when the layout of the results file changes
+RESULTS_VERSION = 1
+PALETTE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "palette.gpl")
+HEIGHT_SCALE = 10.0
+# course size (SVG units), holes, extra hazards, curves per outline and terrain resolution
+SCALES = {
+  "small": {"size": 500, "holes": 1, "hazards": 4, "segments": 8, "resolution": 513},
+  "medium": {"size": 1000, "holes": 3, "hazards": 12, "segments": 12, "resolution": 2049},
+  "large": {"size": 2000, "holes": 9, "hazards": 36, "segments": 16, "resolution": 4097},
+  "huge": {"size": 4000, "holes": 18, "hazards": 72, "segments": 24, "resolution": 8193}
+}
+DEFAULT_SCALES = ["small", "medium"]
+DEFAULT_THRESHOLD = 0.2
+# slowdowns smaller than this are timer noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def course_files(data_dir, name, scale):
+  """
+  Synthetic SVG and RAW for a scale, reused when data_dir already has them
+  """
+  stem = f"{name}-{scale['size']}-{scale['holes']}-{scale['hazards']}-{scale['segments']}"
+  svg_path = os.path.join(data_dir, f"{stem}.svg")
+  raw_path = os.path.join(data_dir, f"terrain-{scale['resolution']}.raw")
+  if not os.path.isfile(svg_path):
+    write_course_svg(svg_path, scale["size"], scale["holes"], scale["hazards"], scale["segments"])
+  if not os.path.isfile(raw_path):
+    write_raw_terrain(raw_path, scale["resolution"])
+  return svg_path, raw_path
+
+
+def run_once(svg_path, raw_path, output_dir, options):
+  """
+  Generates the course once, returning its report
+  """
+  report = RunReport()
+  with report.stage("svg_parse"):
+    svg_info = svg_parse(svg_path, "course")
+  run_job(svg_info, raw_path, job_folder(output_dir), HEIGHT_SCALE, PALETTE_FILE, debug_log=lambda message: None, report=report, **options)
+  return report.to_dict()
+
+
+def stage_results(report):
+  """
+  Flattens a run report into {stage: {wall, cpu, ...}}, with the layer
+  stages summed over every layer and the whole run as "pipeline"
+  """
+  stages = {}
+  for stage in report["stages"]:
+    stages[stage["name"]] = {"wall": stage["wall"], "cpu": stage["cpu"], "peak_rss": stage["peak_rss"]}
+  for stage in report["layer_stages"]:
+    stages[stage["name"]] = {key: stage[key] for key in ("wall", "cpu", "vertices", "triangles")}
+  total = report["total"]
+  stages["pipeline"] = {
+    "wall": total["wall"],
+    "cpu": total["cpu"],
+    "peak_rss": max(total["peak_rss"] or 0, total["layer_peak_rss"] or 0) or None,
+    "vertices": total["vertices"],
+    "triangles": total["triangles"]
+  }
+  return stages
+
+
+def run_scale(name, scale, data_dir, options, repeat=1):
+  svg_path, raw_path = course_files(data_dir, name, scale)
+  best = {}
+  for _run in range(repeat):
+    with tempfile.TemporaryDirectory(prefix="meshery-bench-") as output_dir:
+      stages = stage_results(run_once(svg_path, raw_path, output_dir, options))
+    for stage_name, stage in stages.items():
+      if stage_name not in best or stage["wall"] < best[stage_name]["wall"]:
+        best[stage_name] = stage
+  return {"params": scale, "stages": best}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+  """
+  (scale, stage, baseline wall, wall) of every stage at least threshold
+  (a fraction) slower than in baseline
+  """
+  regressions = []
+  for scale_name, scale in results["scales"].items():
+    base_scale = baseline["scales"].get(scale_name)
+    if not base_scale or base_scale["params"] != scale["params"]:
+      continue
+    for stage_name, stage in scale["stages"].items():
+      base_stage = base_scale["stages"].get(stage_name)
+      if not base_stage:
+        continue
+      slower = stage["wall"] - base_stage["wall"]
+      if slower > MIN_REGRESSION_SECONDS and stage["wall"] > base_stage["wall"] * (1 + threshold):
+        regressions.append((scale_name, stage_name, base_stage["wall"], stage["wall"]))
+  return regressions
+
+
+def print_scale(scale_name, scale, base_scale=None):
+  print(f"{scale_name}: {scale['params']}")
+  for stage_name, stage in scale["stages"].items():
+    line = f"  {stage_name:<18} {stage['wall']:9.3f}s wall {stage['cpu']:9.3f}s cpu"
+    if "triangles" in stage:
+      line += f" {stage['triangles']:>9} triangles"
+    base_stage = base_scale["stages"].get(stage_name) if base_scale else None
+    if base_stage and base_stage["wall"] > 0:
+      line += f"  ({stage['wall'] / base_stage['wall']:.2f}x baseline)"
+    print(line, flush=True)
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=DEFAULT_SCALES, help="course sizes to run (default: %(default)s)")
+  parser.add_argument("--repeat", type=int, default=3, help="runs per scale, keeping each stage's fastest (default: %(default)s)")
+  parser.add_argument("--mesher", choices=MESHERS, default=MESHERS[0], help="interior point layout (default: %(default)s)")
+  parser.add_argument("--workers", type=int, default=1, help="processes used for the layers (default: %(default)s)")
+  parser.add_argument("--data-dir", help="folder keeping the synthetic courses between runs (default: a temporary folder)")
+  parser.add_argument("--output", help="write the results to this JSON file")
+  parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+  parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="fraction a stage may slow down before it counts as a regression (default: %(default)s)")
+  args = parser.parse_args()
+
+  options = {"mesher": args.mesher, "workers": args.workers}
+  baseline = None
+  if args.baseline:
+    with open(args.baseline, 'r') as f:
+      baseline = json.load(f)
+
+  results = {
+    "version": RESULTS_VERSION,
+    "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    "machine": {
+      "platform": platform.platform(),
+      "processor": platform.processor(),
+      "cpus": os.cpu_count(),
+      "python": platform.python_version()
+    },
+    "options": options,
+    "repeat": args.repeat,
+    "scales": {}
+  }
+
+  with tempfile.TemporaryDirectory(prefix="meshery-bench-data-") as temp_dir:
+    data_dir = args.data_dir or temp_dir
+    os.makedirs(data_dir, exist_ok=True)
+    for scale_name in args.scales:
+      scale = run_scale(scale_name, SCALES[scale_name], data_dir, options, max(1, args.repeat))
+      results["scales"][scale_name] = scale
+      print_scale(scale_name, scale, baseline["scales"].get(scale_name) if baseline else None)
+
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2)
+    print(f"Wrote results to {args.output}")
+
+  if baseline:
+    if baseline.get("options") != results["options"]:
+      print(f"Warning: baseline options {baseline.get('options')} differ from {results['options']}")
+    regressions = compare(results, baseline, args.threshold)
+    for scale_name, stage_name, base_wall, wall in regressions:
+      print(f"REGRESSION {scale_name}/{stage_name}: {base_wall:.3f}s -> {wall:.3f}s (+{wall / base_wall - 1:.0%})")
+    if regressions:
+      sys.exit(1)
+    print(f"No stage is more than {args.threshold:.0%} slower than the baseline")
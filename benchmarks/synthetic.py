@@ -0,0 +1,121 @@
+"""
+Writes synthetic courses for benchmarking: an SVG with a rough covering the
+whole course plus a fairway, fringe, green, tee and bunker per hole, and a
+square 16-bit RAW terrain of rolling hills.
+
+  python benchmarks/synthetic.py course.svg terrain.raw [--holes 4] [--resolution 2049]
+"""
+import argparse
+import math
+
+import numpy as np
+
+# fill colors from data/palette.gpl
+SURFACE_COLORS = {
+  "rough": "115b13",
+  "fairway": "00c423",
+  "fringe": "82dda0",
+  "green": "8efeb4",
+  "tee": "86b59a",
+  "sand": "e5dba7",
+  "water": "2967d5"
+}
+# rows of terrain generated (and written) at a time
+RAW_CHUNK_ROWS = 512
+
+
+def blob_path(rng, cx, cy, radius, segments=8, wobble=0.25):
+  """
+  Closed path of cubic curves through segments points around (cx, cy).
+  More segments give more complex outlines.
+  """
+  angles = 2 * math.pi * np.arange(segments) / segments
+  radii = radius * (1 + wobble * rng.uniform(-1, 1, segments))
+  points = np.column_stack((cx + radii * np.cos(angles), cy + radii * np.sin(angles)))
+
+  # Catmull-Rom through the points, written as cubic beziers
+  d = [f"M {points[0][0]:.3f},{points[0][1]:.3f}"]
+  for i in range(segments):
+    p0, p1, p2, p3 = points[i - 1], points[i], points[(i + 1) % segments], points[(i + 2) % segments]
+    c1 = p1 + (p2 - p0) / 6
+    c2 = p2 - (p3 - p1) / 6
+    d.append(f"C {c1[0]:.3f},{c1[1]:.3f} {c2[0]:.3f},{c2[1]:.3f} {p2[0]:.3f},{p2[1]:.3f}")
+  d.append("Z")
+  return " ".join(d)
+
+
+def course_shapes(size=1000, holes=2, hazards=0, segments=8, seed=0):
+  """
+  (surface, path data) of a course, lowest layer first. Every hole adds a
+  fairway, fringe, green, tee and bunker; hazards adds that many extra
+  bunkers and ponds spread over the course.
+  """
+  rng = np.random.default_rng(seed)
+  shapes = [("rough", f"M 0,0 L {size},0 L {size},{size} L 0,{size} Z")]
+  for _hole in range(holes):
+    cx, cy = rng.uniform(0.15, 0.85, 2) * size
+    fairway = size * rng.uniform(0.05, 0.08)
+    shapes.append(("fairway", blob_path(rng, cx, cy, fairway, segments)))
+    shapes.append(("tee", blob_path(rng, cx - fairway * 0.6, cy, fairway * 0.1, segments)))
+    shapes.append(("fringe", blob_path(rng, cx + fairway * 0.5, cy, fairway * 0.35, segments)))
+    shapes.append(("green", blob_path(rng, cx + fairway * 0.5, cy, fairway * 0.28, segments)))
+    shapes.append(("sand", blob_path(rng, cx, cy + fairway * 0.7, fairway * 0.12, segments)))
+  for hazard in range(hazards):
+    cx, cy = rng.uniform(0.05, 0.95, 2) * size
+    surface = "water" if hazard % 4 == 3 else "sand"
+    shapes.append((surface, blob_path(rng, cx, cy, size * rng.uniform(0.005, 0.02), segments)))
+  return shapes
+
+
+def write_course_svg(svg_path, size=1000, holes=2, hazards=0, segments=8, seed=0):
+  """
+  Writes a course SVG with its paths inside a "course" group, like the ones
+  exported for the app. Returns the number of paths.
+  """
+  shapes = course_shapes(size, holes, hazards, segments, seed)
+  lines = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">', '<g id="course">']
+  for index, (surface, d) in enumerate(shapes):
+    lines.append(f'<path id="{surface}{index}" style="fill:#{SURFACE_COLORS[surface]};stroke:none" d="{d}"/>')
+  lines.append('</g>')
+  lines.append('</svg>')
+  with open(svg_path, 'w') as f:
+    f.write("\n".join(lines))
+  return len(shapes)
+
+
+def write_raw_terrain(raw_path, resolution=513, seed=0):
+  """
+  Writes a resolution x resolution little-endian 16-bit RAW heightmap of
+  rolling hills with finer ripples, generated in chunks of rows so 8193^2
+  terrains don't need gigabytes of memory.
+  """
+  rng = np.random.default_rng(seed)
+  phases = rng.uniform(0, 2 * math.pi, 3)
+  x = np.arange(resolution) / resolution
+  with open(raw_path, 'wb') as f:
+    for start in range(0, resolution, RAW_CHUNK_ROWS):
+      y = (np.arange(start, min(start + RAW_CHUNK_ROWS, resolution)) / resolution)[:, np.newaxis]
+      heights = (
+        20000
+        + 10000 * np.sin(6 * x + phases[0]) * np.cos(4 * y + phases[1])
+        + 3000 * np.sin(40 * x * y + phases[2])
+        + 500 * np.sin(120 * x) * np.sin(90 * y)
+      )
+      heights.astype('<u2').tofile(f)
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("svg", help="course SVG to write")
+  parser.add_argument("raw", help="RAW terrain to write")
+  parser.add_argument("--size", type=float, default=1000, help="course width and height in SVG units (default: %(default)s)")
+  parser.add_argument("--holes", type=int, default=2, help="holes on the course (default: %(default)s)")
+  parser.add_argument("--hazards", type=int, default=0, help="extra bunkers and ponds (default: %(default)s)")
+  parser.add_argument("--segments", type=int, default=8, help="curves per outline (default: %(default)s)")
+  parser.add_argument("--resolution", type=int, default=513, help="terrain resolution (default: %(default)s)")
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+
+  paths = write_course_svg(args.svg, args.size, args.holes, args.hazards, args.segments, args.seed)
+  write_raw_terrain(args.raw, args.resolution, args.seed)
+  print(f"Wrote {paths} paths to {args.svg} and a {args.resolution}x{args.resolution} terrain to {args.raw}")
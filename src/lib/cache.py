@@ -0,0 +1,207 @@
+import os
+import json
+import uuid
+import hashlib
+import shutil
+import numpy as np
+import shapely
+
+# bump when sampling or triangulation output changes so stale entries are never reused
+MESH_CACHE_VERSION = 4
+DEFAULT_CACHE_SIZE = 2 * 1024 * 1024 * 1024  # 2 GB
+
+def cache_folder(output_path):
+  """
+  Default cache location inside an output folder (hidden from Unity's importer)
+  """
+  return os.path.join(output_path, ".meshery-cache")
+
+def geometry_hash(geometry, **params):
+  """
+  Stable hash of a shapely geometry and the parameters used to mesh it
+  """
+  digest = hashlib.sha256(geometry.wkb)
+  digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+  return digest.hexdigest()
+
+def layer_input_hash(layer):
+  """
+  Hash of what an SVG layer's sampled polygon and surface depend on: its path
+  data, transform and fill
+  """
+  attr = layer['attr']
+  inputs = {
+    "d": attr.get("d"),
+    "transform": layer.get("transform"),
+    "style": attr.get("style"),
+    "fill": attr.get("fill")
+  }
+  return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+def file_signature(file_path):
+  """
+  Cheap identity of a file's contents (path, size and modification time)
+  """
+  stat = os.stat(file_path)
+  return {
+    "path": os.path.abspath(file_path),
+    "size": stat.st_size,
+    "mtime": stat.st_mtime_ns
+  }
+
+class MeshCache:
+  """
+  On-disk cache of per-layer 2D triangulations, stored as .npz files and
+  evicting the least recently used entries once the folder grows past
+  max_bytes. Safe to share between the processes of one run.
+  """
+
+  def __init__(self, directory, max_bytes=DEFAULT_CACHE_SIZE):
+    self.directory = directory
+    self.max_bytes = max_bytes
+    os.makedirs(self.directory, exist_ok=True)
+
+  def key(self, poly, **params):
+    return geometry_hash(poly, version=MESH_CACHE_VERSION, **params)
+
+  def layer_key(self, layer, **params):
+    """
+    Key of the polygon sampled from an SVG layer with the given parameters
+    """
+    digest = hashlib.sha256(f"{layer_input_hash(layer)}-{MESH_CACHE_VERSION}".encode("utf-8"))
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+  def _entry_path(self, key):
+    return os.path.join(self.directory, f"{key}.npz")
+
+  def _load(self, key):
+    entry_path = self._entry_path(key)
+    try:
+      with np.load(entry_path) as entry:
+        arrays = {name: entry[name] for name in entry.files}
+      # Mark as recently used for eviction
+      os.utime(entry_path)
+    except (OSError, ValueError):
+      return None
+    return arrays
+
+  def _store(self, key, **arrays):
+    entry_path = self._entry_path(key)
+    # Write under a temporary name so readers never see a partial entry
+    temp_path = os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp.npz")
+    np.savez(temp_path, **arrays)
+    os.replace(temp_path, entry_path)
+    self.evict()
+
+  def get(self, key):
+    """
+    Returns the cached (vertices, faces) for key, or None
+    """
+    entry = self._load(key)
+    if entry is None or "vertices" not in entry or "faces" not in entry:
+      return None
+    return entry["vertices"], entry["faces"]
+
+  def put(self, key, vertices, faces):
+    self._store(key, vertices=vertices, faces=faces)
+
+  def get_polygon(self, key):
+    """
+    Returns the cached polygon sampled from an SVG layer, or None
+    """
+    entry = self._load(key)
+    if entry is None or "wkb" not in entry:
+      return None
+    return shapely.from_wkb(entry["wkb"].tobytes())
+
+  def put_polygon(self, key, poly):
+    self._store(key, wkb=np.frombuffer(poly.wkb, dtype=np.uint8))
+
+  def evict(self):
+    """
+    Deletes the least recently used entries until the cache fits in max_bytes
+    """
+    entries = []
+    total_size = 0
+    with os.scandir(self.directory) as it:
+      for entry in it:
+        if not entry.name.endswith(".npz") or entry.name.startswith("."):
+          continue
+        try:
+          stat = entry.stat()
+        except FileNotFoundError:
+          continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size += stat.st_size
+
+    for _mtime, size, path in sorted(entries):
+      if total_size <= self.max_bytes:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      total_size -= size
+
+class OutputIndex:
+  """
+  Remembers which job folder holds the files exported for each layer output
+  key, so layers that did not change can be copied from the previous run
+  instead of being generated again.
+  """
+
+  def __init__(self, directory):
+    self.path = os.path.join(directory, "outputs.json")
+    self.previous = self._read()
+    self.current = {}
+
+  def _read(self):
+    try:
+      with open(self.path, 'r') as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      return {}
+
+  @staticmethod
+  def _exists(files):
+    return bool(files) and all(os.path.isfile(file_path) for file_path in files)
+
+  def find(self, key):
+    """
+    Files recorded for key by an earlier run, or None if any have gone
+    """
+    files = self.previous.get(key)
+    if not self._exists(files):
+      return None
+    return files
+
+  def reuse(self, key, output_path):
+    """
+    Copies the files recorded for key into output_path. Returns the copies,
+    or None when there is nothing to reuse. The copies are not recorded:
+    callers that keep them call record() themselves.
+    """
+    files = self.find(key)
+    if files is None:
+      return None
+    copies = []
+    for file_path in files:
+      copy_path = os.path.join(output_path, os.path.basename(file_path))
+      shutil.copyfile(file_path, copy_path)
+      copies.append(copy_path)
+    return copies
+
+  def record(self, key, files):
+    self.current[key] = files
+
+  def save(self):
+    # Re-read the index so entries saved meanwhile by other jobs sharing
+    # this cache folder are kept, dropping those whose job folders are gone
+    entries = {**self.previous, **self._read()}
+    entries = {key: files for key, files in entries.items() if self._exists(files)}
+    entries.update(self.current)
+    temp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w') as f:
+      json.dump(entries, f, indent=2)
+    os.replace(temp_path, self.path)
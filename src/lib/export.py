@@ -1,9 +1,31 @@
-import sys
 import os
+import json
 import uuid
+import struct
+import numpy as np
 
 from lib.color import hex_to_rgba
 
+# rows formatted per write() and the size of the file buffer when writing OBJs
+OBJ_CHUNK_ROWS = 65536
+OBJ_WRITE_BUFFER = 4 * 1024 * 1024
+
+# GLB container and glTF enums
+GLB_MAGIC = 0x46546C67  # "glTF"
+GLB_VERSION = 2
+GLB_JSON_CHUNK = 0x4E4F534A
+GLB_BIN_CHUNK = 0x004E4942
+GLTF_UNSIGNED_SHORT = 5123
+GLTF_UNSIGNED_INT = 5125
+GLTF_FLOAT = 5126
+GLTF_ARRAY_BUFFER = 34962
+GLTF_ELEMENT_ARRAY_BUFFER = 34963
+GLTF_TRIANGLES = 4
+# lets positions be stored as normalized 16-bit integers
+QUANTIZATION_EXTENSION = "KHR_mesh_quantization"
+# bytes copied at a time when merging GLB files
+GLB_COPY_BLOCK = 4 * 1024 * 1024
+
 def make_folder(directory_path):
   try:
     # Create the directory, including any necessary parent directories
@@ -12,8 +34,7 @@ def make_folder(directory_path):
     print(f"Directory '{directory_path}' created successfully")
   except OSError as e:
     # Handle other potential OS errors (e.g., permission issues, invalid path)
-    print(f"Error creating directory '{directory_path}': {e}")
-    sys.exit(1)
+    raise OSError(f"Error creating directory '{directory_path}': {e}") from e
 
 def export_mat(mtl_filename, surface, color_hex):
   r, g, b = hex_to_rgba(color_hex)
@@ -27,22 +48,293 @@ def export_mat(mtl_filename, surface, color_hex):
       mtl_file.write(f"Ns 10.0\n")  # Shininess
       mtl_file.write(f"d 1.0\n")  # Transparency
 
-def export_obj(obj_filename, surface, mesh):
+def write_rows(out_file, line_format, rows, chunk_size=OBJ_CHUNK_ROWS, check_cancelled=None, offset=0):
+  """
+  Formats a 2D array in blocks of rows, one string and one write() per block.
+  offset is added to every value (widening small integer types first).
+  """
+  for start in range(0, len(rows), chunk_size):
+    if check_cancelled:
+      check_cancelled()
+    block = rows[start:start + chunk_size]
+    if offset:
+      block = block.astype(np.int64) + offset
+    out_file.write((line_format * len(block)) % tuple(block.ravel().tolist()))
+
+def export_obj(obj_filename, surface, vertices, faces, precision=6, check_cancelled=None):
+
   # Write OBJ file
-  with open(obj_filename, 'w') as obj_file:
+  with open(obj_filename, 'w', buffering=OBJ_WRITE_BUFFER) as obj_file:
       obj_file.write(f"# {surface} mesh\n")
       obj_file.write(f"mtllib {os.path.basename(obj_filename)}\n")
       obj_file.write(f"o {surface}\n")
       obj_file.write(f"usemtl {surface}_material\n\n")
       
       # Write vertices
-      for vertex in mesh.vertices:
-        obj_file.write(f"v {vertex[0]:.6f} {vertex[1]:.6f} {vertex[2]:.6f}\n")
+      write_rows(obj_file, f"v %.{precision}f %.{precision}f %.{precision}f\n", vertices, check_cancelled=check_cancelled)
       
       # Write faces
-      for face in mesh.faces:
-        # OBJ uses 1-based indexing
-        f1 = face[0] + 1
-        f2 = face[1] + 1
-        f3 = face[2] + 1
-        obj_file.write(f"f {f1} {f2} {f3}\n")
+      # OBJ uses 1-based indexing
+      write_rows(obj_file, "f %d %d %d\n", faces, check_cancelled=check_cancelled, offset=1)
+
+def srgb_to_linear(value):
+  """
+  Converts an 8-bit sRGB channel to the linear 0-1 value glTF colors use
+  """
+  value = value / 255
+  if value <= 0.04045:
+    return value / 12.92
+  return ((value + 0.055) / 1.055) ** 2.4
+
+def gltf_material(surface, color_hex):
+  r, g, b = hex_to_rgba(color_hex)
+  return {
+    "name": f"{surface}_material",
+    "pbrMetallicRoughness": {
+      "baseColorFactor": [srgb_to_linear(r), srgb_to_linear(g), srgb_to_linear(b), 1.0],
+      "metallicFactor": 0.0,
+      "roughnessFactor": 1.0
+    }
+  }
+
+def gltf_document():
+  return {
+    "asset": {"version": "2.0", "generator": "OpenGolfSim Course Meshery"},
+    "scene": 0,
+    "scenes": [{"nodes": []}],
+    "nodes": [],
+    "meshes": [],
+    "materials": [],
+    "accessors": [],
+    "bufferViews": [],
+    "buffers": []
+  }
+
+def quantize_positions(vertices):
+  """
+  Positions as normalized uint16s, padded to four components so every
+  vertex stays 4-byte aligned, plus the translation and scale that restore
+  them (applied by the mesh's node)
+  """
+  vertices = vertices.astype(np.float64)
+  low = vertices.min(axis=0)
+  extent = vertices.max(axis=0) - low
+  extent = np.where(extent > 0, extent, 1.0)
+  quantized = np.zeros((len(vertices), 4), dtype='<u2')
+  quantized[:, :3] = np.rint((vertices - low) / extent * 65535)
+  return quantized, low, extent
+
+def export_glb(glb_filename, meshes, quantize=False, check_cancelled=None):
+  """
+  Writes meshes (dicts with name, surface, color, vertices and faces) to a
+  binary glTF file with one node per mesh and one material per surface.
+  Indices are uint16 when a mesh has few enough vertices, otherwise uint32.
+  With quantize, positions are stored as 16-bit integers using
+  KHR_mesh_quantization, which halves their size.
+  """
+  gltf = gltf_document()
+  materials = {}
+  buffer_data = []
+  buffer_length = 0
+
+  def add_buffer_view(data, target, byte_stride=None):
+    nonlocal buffer_length
+    view = {"buffer": 0, "byteOffset": buffer_length, "byteLength": len(data), "target": target}
+    if byte_stride:
+      view["byteStride"] = byte_stride
+    gltf["bufferViews"].append(view)
+    # Keep every view 4-byte aligned
+    padding = -len(data) % 4
+    buffer_data.append(data + b"\0" * padding)
+    buffer_length += len(data) + padding
+    return len(gltf["bufferViews"]) - 1
+
+  def add_accessor(accessor):
+    gltf["accessors"].append(accessor)
+    return len(gltf["accessors"]) - 1
+
+  for mesh in meshes:
+    if check_cancelled:
+      check_cancelled()
+    vertices = np.asarray(mesh["vertices"])
+    faces = np.asarray(mesh["faces"])
+    node = {"name": mesh["name"], "mesh": len(gltf["meshes"])}
+
+    if quantize:
+      positions, translation, scale = quantize_positions(vertices)
+      position_view = add_buffer_view(positions.tobytes(), GLTF_ARRAY_BUFFER, byte_stride=8)
+      position_accessor = add_accessor({
+        "bufferView": position_view,
+        "componentType": GLTF_UNSIGNED_SHORT,
+        "normalized": True,
+        "count": len(positions),
+        "type": "VEC3",
+        "min": (positions[:, :3].min(axis=0) / 65535).tolist(),
+        "max": (positions[:, :3].max(axis=0) / 65535).tolist()
+      })
+      node["translation"] = translation.tolist()
+      node["scale"] = scale.tolist()
+    else:
+      positions = vertices.astype('<f4', copy=False)
+      position_view = add_buffer_view(positions.tobytes(), GLTF_ARRAY_BUFFER)
+      position_accessor = add_accessor({
+        "bufferView": position_view,
+        "componentType": GLTF_FLOAT,
+        "count": len(positions),
+        "type": "VEC3",
+        "min": positions.min(axis=0).tolist(),
+        "max": positions.max(axis=0).tolist()
+      })
+
+    # The largest value of each index type is reserved for primitive restart
+    if len(vertices) < 0xFFFF:
+      indices, component_type = faces.astype('<u2'), GLTF_UNSIGNED_SHORT
+    else:
+      indices, component_type = faces.astype('<u4'), GLTF_UNSIGNED_INT
+    index_view = add_buffer_view(indices.tobytes(), GLTF_ELEMENT_ARRAY_BUFFER)
+    index_accessor = add_accessor({
+      "bufferView": index_view,
+      "componentType": component_type,
+      "count": indices.size,
+      "type": "SCALAR"
+    })
+
+    if mesh["surface"] not in materials:
+      materials[mesh["surface"]] = len(gltf["materials"])
+      gltf["materials"].append(gltf_material(mesh["surface"], mesh["color"]))
+
+    gltf["meshes"].append({
+      "name": mesh["name"],
+      "primitives": [{
+        "attributes": {"POSITION": position_accessor},
+        "indices": index_accessor,
+        "material": materials[mesh["surface"]],
+        "mode": GLTF_TRIANGLES
+      }]
+    })
+    gltf["scenes"][0]["nodes"].append(len(gltf["nodes"]))
+    gltf["nodes"].append(node)
+
+  if quantize:
+    gltf["extensionsUsed"] = [QUANTIZATION_EXTENSION]
+    gltf["extensionsRequired"] = [QUANTIZATION_EXTENSION]
+  write_glb(glb_filename, gltf, buffer_data, buffer_length)
+
+def write_glb(glb_filename, gltf, buffer_data, buffer_length):
+  """
+  Writes a GLB container: the glTF JSON followed by one binary buffer of
+  buffer_length bytes, written block by block from buffer_data
+  """
+  if buffer_length:
+    gltf["buffers"] = [{"byteLength": buffer_length}]
+  else:
+    gltf.pop("buffers", None)
+  json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+  json_chunk += b" " * (-len(json_chunk) % 4)
+  total_length = 12 + 8 + len(json_chunk) + (8 + buffer_length if buffer_length else 0)
+
+  with open(glb_filename, 'wb', buffering=OBJ_WRITE_BUFFER) as glb_file:
+    glb_file.write(struct.pack('<III', GLB_MAGIC, GLB_VERSION, total_length))
+    glb_file.write(struct.pack('<II', len(json_chunk), GLB_JSON_CHUNK))
+    glb_file.write(json_chunk)
+    if buffer_length:
+      glb_file.write(struct.pack('<II', buffer_length, GLB_BIN_CHUNK))
+      for block in buffer_data:
+        glb_file.write(block)
+
+def read_glb_header(glb_filename):
+  """
+  Returns the glTF JSON of a GLB file with the offset and length of its
+  binary chunk, without reading the binary data
+  """
+  with open(glb_filename, 'rb') as glb_file:
+    magic, _version, _length = struct.unpack('<III', glb_file.read(12))
+    if magic != GLB_MAGIC:
+      raise ValueError(f"{glb_filename} is not a GLB file")
+    json_length, _chunk_type = struct.unpack('<II', glb_file.read(8))
+    gltf = json.loads(glb_file.read(json_length))
+    header = glb_file.read(8)
+    if len(header) < 8:
+      return gltf, 0, 0
+    bin_length, _chunk_type = struct.unpack('<II', header)
+    return gltf, 12 + 8 + json_length + 8, bin_length
+
+def read_glb_blocks(glb_filename, offset, length):
+  with open(glb_filename, 'rb') as glb_file:
+    glb_file.seek(offset)
+    while length > 0:
+      block = glb_file.read(min(GLB_COPY_BLOCK, length))
+      if not block:
+        raise ValueError(f"{glb_filename} is truncated")
+      length -= len(block)
+      yield block
+
+def merge_glb(glb_filename, part_filenames, check_cancelled=None):
+  """
+  Combines GLB files written by export_glb into one, keeping a node per
+  mesh and sharing materials with the same name and color. Binary data is
+  copied in blocks, so the parts are never all in memory at once.
+  """
+  gltf = gltf_document()
+  materials = {}
+  extensions = {"extensionsUsed": [], "extensionsRequired": []}
+  sources = []
+  buffer_length = 0
+
+  for part_filename in part_filenames:
+    if check_cancelled:
+      check_cancelled()
+    part, bin_offset, bin_length = read_glb_header(part_filename)
+    view_base = len(gltf["bufferViews"])
+    accessor_base = len(gltf["accessors"])
+    mesh_base = len(gltf["meshes"])
+    node_base = len(gltf["nodes"])
+
+    for view in part.get("bufferViews", []):
+      gltf["bufferViews"].append({**view, "byteOffset": view.get("byteOffset", 0) + buffer_length})
+    for accessor in part.get("accessors", []):
+      gltf["accessors"].append({**accessor, "bufferView": accessor["bufferView"] + view_base})
+
+    material_indices = []
+    for material in part.get("materials", []):
+      key = json.dumps(material, sort_keys=True)
+      if key not in materials:
+        materials[key] = len(gltf["materials"])
+        gltf["materials"].append(material)
+      material_indices.append(materials[key])
+
+    for mesh in part.get("meshes", []):
+      primitives = []
+      for primitive in mesh["primitives"]:
+        primitive = {**primitive, "attributes": {name: index + accessor_base for name, index in primitive["attributes"].items()}}
+        if "indices" in primitive:
+          primitive["indices"] += accessor_base
+        if "material" in primitive:
+          primitive["material"] = material_indices[primitive["material"]]
+        primitives.append(primitive)
+      gltf["meshes"].append({**mesh, "primitives": primitives})
+
+    for node in part.get("nodes", []):
+      node = dict(node)
+      if "mesh" in node:
+        node["mesh"] += mesh_base
+      if "children" in node:
+        node["children"] = [child + node_base for child in node["children"]]
+      gltf["nodes"].append(node)
+    scenes = part.get("scenes", [])
+    if scenes:
+      gltf["scenes"][0]["nodes"].extend(node + node_base for node in scenes[part.get("scene", 0)].get("nodes", []))
+
+    for name, used in extensions.items():
+      used.extend(extension for extension in part.get(name, []) if extension not in used)
+
+    if bin_length:
+      sources.append((part_filename, bin_offset, bin_length))
+      buffer_length += bin_length
+
+  for name, used in extensions.items():
+    if used:
+      gltf[name] = used
+
+  buffer_data = (block for source in sources for block in read_glb_blocks(*source))
+  write_glb(glb_filename, gltf, buffer_data, buffer_length)
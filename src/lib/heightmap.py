@@ -2,7 +2,11 @@ import numpy as np
 import math
 import os
 
-def read_raw_heightmap(raw_file):
+def read_raw_heightmap(raw_file, memmap=False):
+    """
+    Reads a square 16-bit RAW heightmap. With memmap=True the samples stay
+    on disk and are paged in only where they are read.
+    """
     # Unity uses 16-bit unsigned, little-endian
     file_size = os.path.getsize(raw_file)  # in bytes
     num_samples = file_size // 2  # 2 bytes per uint16 sample
@@ -11,21 +15,75 @@ def read_raw_heightmap(raw_file):
     height = width
     assert width * height == num_samples, f"Heightmap is not square! {width * height} != {num_samples}"
 
-    with open(raw_file, "rb") as f:
-        # data = np.frombuffer(f.read(), dtype=np.uint8)
-        data = np.frombuffer(f.read(), dtype=np.uint16)
-    heightmap = data.reshape((height, width))
     # Load the RAW file (little-endian)
-    # data = np.fromfile(filename, dtype='<u2')  # '<u2' = little-endian uint16
-    # heightmap = data.reshape((height, width))
+    if memmap:
+        heightmap = map_raw_heightmap(raw_file, width)
+        # Reading the range through the map would page in the whole file
+        min_height, max_height = raw_heightmap_range(raw_file, width)
+    else:
+        data = np.fromfile(raw_file, dtype='<u2')  # '<u2' = little-endian uint16
+        heightmap = data.reshape((height, width))
+        min_height, max_height = heightmap_range(heightmap)
 
     return {
         "data": heightmap,
         "resolution": width,
-        "min": heightmap.min(),
-        "max": heightmap.max()
+        "min": min_height,
+        "max": max_height
     }
 
+def map_raw_heightmap(raw_file, resolution):
+    """
+    Memory maps a square RAW heightmap read-only, so several processes can
+    share the same pages instead of their own copies
+    """
+    return np.memmap(raw_file, dtype='<u2', mode='r', shape=(resolution, resolution))
+
+def heightmap_range(heightmap, rows_per_chunk=256):
+    """
+    Min and max height in a single streaming pass over blocks of rows
+    """
+    min_height = None
+    max_height = None
+    for start in range(0, heightmap.shape[0], rows_per_chunk):
+        block = np.asarray(heightmap[start:start + rows_per_chunk])
+        block_min = block.min()
+        block_max = block.max()
+        min_height = block_min if min_height is None else min(min_height, block_min)
+        max_height = block_max if max_height is None else max(max_height, block_max)
+    return min_height, max_height
+
+def raw_heightmap_range(raw_file, resolution, rows_per_chunk=256):
+    """
+    Min and max height of a RAW heightmap, read block by block into one
+    reused buffer so memory stays bounded whatever the resolution
+    """
+    block = np.empty(rows_per_chunk * resolution, dtype='<u2')
+    min_height = None
+    max_height = None
+    with open(raw_file, 'rb') as f:
+        while True:
+            count = f.readinto(memoryview(block).cast('B')) // 2
+            if count == 0:
+                break
+            block_min = block[:count].min()
+            block_max = block[:count].max()
+            min_height = block_min if min_height is None else min(min_height, block_min)
+            max_height = block_max if max_height is None else max(max_height, block_max)
+    return min_height, max_height
+
+def heightmap_window(heightmap, x, z, margin=2):
+    """
+    Returns the part of the heightmap covering the pixel coordinates x, z
+    (plus a margin for the interpolation kernel) and its row/column offset
+    """
+    hm_height, hm_width = heightmap.shape
+    x_start = max(int(np.floor(x.min())) - margin, 0)
+    x_end = min(int(np.floor(x.max())) + margin + 1, hm_width)
+    z_start = max(int(np.floor(z.min())) - margin, 0)
+    z_end = min(int(np.floor(z.max())) + margin + 1, hm_height)
+    window = np.asarray(heightmap[z_start:z_end, x_start:x_end])
+    return window, x_start, z_start
 
 def bilinear_interpolate_height(heightmap, x, z):
     """
@@ -59,17 +117,101 @@ def bilinear_interpolate_height(heightmap, x, z):
     
     return h0 * (1 - fz) + h1 * fz
 
-def map_mesh_to_heightmap(vertices, heightmap, svg_width, svg_height, height_scale=1.0):
-    # Apply heights with interpolation
+def sample_heights(heightmap, x, z, method="bilinear"):
+    """
+    Sample the heightmap at arrays of pixel coordinates in one pass.
+    method is either "bilinear" or "bicubic" (Catmull-Rom)
+    """
+    hm_height, hm_width = heightmap.shape
+
+    # Clamp coordinates to valid range
+    x = np.clip(np.asarray(x, dtype=np.float64), 0, hm_width - 1)
+    z = np.clip(np.asarray(z, dtype=np.float64), 0, hm_height - 1)
+
+    # Get integer coordinates and fractional parts
+    x0 = np.floor(x).astype(np.intp)
+    z0 = np.floor(z).astype(np.intp)
+    fx = x - x0
+    fz = z - z0
+
+    if method == "bilinear":
+        x1 = np.minimum(x0 + 1, hm_width - 1)
+        z1 = np.minimum(z0 + 1, hm_height - 1)
+
+        h00 = heightmap[z0, x0].astype(np.float64)
+        h10 = heightmap[z0, x1].astype(np.float64)
+        h01 = heightmap[z1, x0].astype(np.float64)
+        h11 = heightmap[z1, x1].astype(np.float64)
+
+        h0 = h00 * (1 - fx) + h10 * fx
+        h1 = h01 * (1 - fx) + h11 * fx
+
+        return h0 * (1 - fz) + h1 * fz
+
+    if method == "bicubic":
+        wx = _catmull_rom_weights(fx)
+        wz = _catmull_rom_weights(fz)
+
+        heights = np.zeros(x.shape, dtype=np.float64)
+        for j in range(4):
+            zj = np.clip(z0 + j - 1, 0, hm_height - 1)
+            row = np.zeros(x.shape, dtype=np.float64)
+            for i in range(4):
+                xi = np.clip(x0 + i - 1, 0, hm_width - 1)
+                row += wx[i] * heightmap[zj, xi]
+            heights += wz[j] * row
+        return heights
+
+    raise ValueError(f"Unknown interpolation method: {method}")
+
+def _catmull_rom_weights(t):
+    """
+    Weights of the four samples around t for Catmull-Rom interpolation
+    """
+    return (
+        ((-0.5 * t + 1.0) * t - 0.5) * t,
+        (1.5 * t - 2.5) * t * t + 1.0,
+        ((-1.5 * t + 2.0) * t + 0.5) * t,
+        (0.5 * t - 0.5) * t * t
+    )
+
+def map_mesh_to_heightmap(vertices, heightmap, svg_width, svg_height, height_scale=1.0, method="bilinear"):
+    # Apply heights with interpolation to the whole vertex array at once
     hm_height, hm_width = heightmap.shape
     max_height = 65535.0  # Unity's 16-bit range
-    for v in vertices:
-        x = (v[0] / svg_width) * hm_width
-        z = (v[2] / svg_height) * hm_height
-        
-        height = bilinear_interpolate_height(heightmap, x, z)
-        # v[1] = height * height_scale
-        v[1] = ((height / max_height) * height_scale)
-    
+    x = (vertices[:, 0] / svg_width) * hm_width
+    z = (vertices[:, 2] / svg_height) * hm_height
+
+    if len(vertices) == 0:
+        return vertices
+
+    # Only read the part of the heightmap under this mesh
+    x = np.clip(x, 0, hm_width - 1)
+    z = np.clip(z, 0, hm_height - 1)
+    window, x_offset, z_offset = heightmap_window(heightmap, x, z)
+
+    heights = sample_heights(window, x - x_offset, z - z_offset, method)
+    vertices[:, 1] = (heights / max_height) * height_scale
+
     return vertices
 
+def terrain_sampler(heightmap, bounds, svg_width, svg_height, height_scale=1.0, method="bilinear"):
+    """
+    Returns a function giving the terrain height (in the same units as
+    map_mesh_to_heightmap) at arrays of SVG x, z coordinates within bounds
+    (min_x, min_z, max_x, max_z). Only that part of the heightmap is read.
+    """
+    hm_height, hm_width = heightmap.shape
+    max_height = 65535.0  # Unity's 16-bit range
+    min_x, min_z, max_x, max_z = bounds
+    corners_x = np.clip(np.array([min_x, max_x]) / svg_width * hm_width, 0, hm_width - 1)
+    corners_z = np.clip(np.array([min_z, max_z]) / svg_height * hm_height, 0, hm_height - 1)
+    window, x_offset, z_offset = heightmap_window(heightmap, corners_x, corners_z)
+
+    def heights_at(x, z):
+        x = np.clip((np.asarray(x) / svg_width) * hm_width, 0, hm_width - 1)
+        z = np.clip((np.asarray(z) / svg_height) * hm_height, 0, hm_height - 1)
+        heights = sample_heights(window, x - x_offset, z - z_offset, method)
+        return (heights / max_height) * height_scale
+
+    return heights_at
@@ -1,29 +1,51 @@
-from shapely.geometry import Polygon, Point
+from shapely.geometry import Polygon
+import shapely
 import numpy as np
+from svgpathtools import Line, QuadraticBezier, CubicBezier, Arc
 from matplotlib.tri import Triangulation
+from scipy.spatial import cKDTree
+
+# graded meshes switch to the next coarser spacing this many spacings away from the boundary
+DEFAULT_GRADING = 4.0
+# refinement passes made by the adaptive mesher before it settles for the error reached
+MAX_REFINEMENT_PASSES = 16
+# the adaptive mesher's starting mesh coarsens one level per spacing from the boundary
+ADAPTIVE_START_GRADING = 1.0
+
+# barycentric weights of the points each triangle's terrain error is measured at:
+# the centroid, the edge midpoints and halfway from the centroid to each corner
+ERROR_SAMPLE_WEIGHTS = np.array([
+    [1 / 3, 1 / 3, 1 / 3],
+    [0.5, 0.5, 0.0],
+    [0.0, 0.5, 0.5],
+    [0.5, 0.0, 0.5],
+    [2 / 3, 1 / 6, 1 / 6],
+    [1 / 6, 2 / 3, 1 / 6],
+    [1 / 6, 1 / 6, 2 / 3]
+])
 
 def densify_polygon_boundary(coords, target_spacing):
     """
     Add more points along polygon edges for smoother boundaries
     """
-    coords = np.array(coords)
-    densified = [coords[0]]  # Start with first point
-
-    for i in range(len(coords)):
-        p1 = coords[i]
-        p2 = coords[(i + 1) % len(coords)]
-        
-        # Calculate distance and number of segments needed
-        dist = np.linalg.norm(p2 - p1)
-        num_segments = max(1, int(dist / target_spacing))
-        
-        # Add intermediate points
-        for j in range(1, num_segments + 1):
-            t = j / num_segments
-            point = p1 + t * (p2 - p1)
-            densified.append(point)
-
-    return np.array(densified[:-1])  # Remove duplicate last point
+    coords = np.array(coords, dtype=np.float64)
+    starts = coords
+    ends = np.roll(coords, -1, axis=0)
+    deltas = ends - starts
+
+    # Calculate distance and number of segments needed for every edge
+    dists = np.sqrt(np.sum(deltas * deltas, axis=1))
+    num_segments = np.maximum(1, (dists / target_spacing).astype(np.int64))
+
+    # Intermediate points j / n (j = 1..n) of every edge in one pass
+    edge = np.repeat(np.arange(len(coords)), num_segments)
+    offsets = np.cumsum(num_segments) - num_segments
+    j = np.arange(len(edge)) - np.repeat(offsets, num_segments) + 1
+    t = j / num_segments[edge]
+    points = starts[edge] + t[:, None] * deltas[edge]
+
+    # Start with first point and remove the duplicate last point
+    return np.concatenate((coords[:1], points[:-1]))
 
 def densify_polygon(poly: Polygon, target_spacing=2.0):
     """
@@ -45,14 +67,393 @@ def densify_polygon(poly: Polygon, target_spacing=2.0):
     
     return Polygon(densified_exterior, holes=densified_holes)
 
+def segment_points(segment, t):
+    """
+    Evaluates an svgpathtools segment at an array of t values, returning
+    complex points
+    """
+    if isinstance(segment, Line):
+        return segment.start + (segment.end - segment.start) * t
+    if isinstance(segment, QuadraticBezier):
+        mt = 1 - t
+        return mt * mt * segment.start + 2 * mt * t * segment.control + t * t * segment.end
+    if isinstance(segment, CubicBezier):
+        mt = 1 - t
+        return (mt * mt * mt * segment.start + 3 * mt * mt * t * segment.control1
+                + 3 * mt * t * t * segment.control2 + t * t * t * segment.end)
+    if isinstance(segment, Arc):
+        angle = np.radians(segment.theta + t * segment.delta)
+        rx = segment.radius.real
+        ry = segment.radius.imag
+        return segment.center + segment.rot_matrix * (rx * np.cos(angle) + 1j * ry * np.sin(angle))
+    return np.array([segment.point(value) for value in t])
+
+def _segment_arc_lengths(path, resolution):
+    """
+    Cumulative arc length of each segment along a dense, evenly spaced t grid
+    """
+    t_dense = np.linspace(0, 1, resolution + 1)
+    arc_lengths = []
+    for segment in path:
+        dense = segment_points(segment, t_dense)
+        arc_lengths.append(np.concatenate(([0.0], np.cumsum(np.abs(np.diff(dense))))))
+    return t_dense, arc_lengths
+
+def path_length(path, resolution=64):
+    """
+    Length of a path, measured along the same dense samples as sample_path
+    """
+    _t_dense, arc_lengths = _segment_arc_lengths(path, resolution)
+    return sum(arc_length[-1] for arc_length in arc_lengths)
+
+def sample_path(path, num_points=1000, resolution=64):
+    """
+    Samples a path into about num_points (x, y) points. Points are shared
+    between segments by length and spaced evenly by arc length inside each
+    segment, so short segments are not oversampled.
+    """
+    t_dense, arc_lengths = _segment_arc_lengths(path, resolution)
+    total_length = sum(arc_length[-1] for arc_length in arc_lengths)
+    if total_length == 0:
+        return np.empty((0, 2))
+
+    samples = []
+    for segment, arc_length in zip(path, arc_lengths):
+        segment_length = arc_length[-1]
+        if segment_length == 0:
+            continue
+        count = max(1, int(round(num_points * segment_length / total_length)))
+        # Evenly spaced distances along the segment, mapped back to t. The
+        # segment end is left to the start of the next segment
+        distances = np.arange(count) * (segment_length / count)
+        t = np.interp(distances, arc_length, t_dense)
+        samples.append(segment_points(segment, t))
+
+    points = np.concatenate(samples)
+    return np.column_stack((points.real, points.imag))
+
 def path_to_polygon(path, num_points=1000):
-    points = [path.point(t) for t in np.linspace(0, 1, num_points)]
-    coords = [(pt.real, pt.imag) for pt in points]
-    return Polygon(coords)
+    return Polygon(sample_path(path, num_points))
+
+def simplify_polygon(poly: Polygon, tolerance):
+    """
+    Drops redundant (nearly collinear) outline samples with Douglas-Peucker,
+    keeping every point that deviates more than tolerance from the simplified
+    outline. Curved stretches keep their points, straight ones collapse.
+    """
+    if tolerance <= 0 or poly.is_empty:
+        return poly
+    simplified = poly.simplify(tolerance, preserve_topology=True)
+    if simplified.is_empty or simplified.geom_type != "Polygon":
+        return poly
+    return simplified
+
+def polygon_parts(geometry):
+    """
+    The non-empty polygons making up a polygon, multipolygon or collection
+    """
+    if geometry.is_empty:
+        return []
+    if isinstance(geometry, Polygon):
+        return [geometry]
+    parts = []
+    for part in getattr(geometry, 'geoms', []):
+        parts.extend(polygon_parts(part))
+    return parts
+
+def clip_to_tiles(geometry, tile_size):
+    """
+    Splits a geometry along a grid of tile_size squares anchored at the
+    origin. Returns (column, row, bounds, piece) for every tile it covers,
+    where piece is the part of the geometry inside bounds.
+    """
+    minx, miny, maxx, maxy = geometry.bounds
+    columns = np.arange(int(np.floor(minx / tile_size)), int(np.ceil(maxx / tile_size)))
+    rows = np.arange(int(np.floor(miny / tile_size)), int(np.ceil(maxy / tile_size)))
+    column, row = np.meshgrid(columns, rows, indexing='ij')
+    column = column.ravel()
+    row = row.ravel()
+
+    boxes = shapely.box(column * tile_size, row * tile_size, (column + 1) * tile_size, (row + 1) * tile_size)
+    shapely.prepare(geometry)
+    covered = shapely.intersects(geometry, boxes)
+    pieces = shapely.intersection(geometry, boxes[covered])
+
+    tiles = []
+    for tile_column, tile_row, tile_box, piece in zip(column[covered], row[covered], boxes[covered], pieces):
+        if piece.area > 0:
+            tiles.append((int(tile_column), int(tile_row), tile_box.bounds, piece))
+    return tiles
+
+def index_dtype(vertex_count):
+    """
+    Smallest unsigned integer type that can index vertex_count vertices
+    """
+    return np.min_scalar_type(max(vertex_count - 1, 0))
+
+def compact_mesh(points, triangles):
+    """
+    Flat (Y = 0) mesh of the 2D points used by triangles: unused points are
+    dropped, vertices are float32 and faces use index_dtype
+    """
+    used = np.zeros(len(points), dtype=bool)
+    used[triangles] = True
+    remap = np.cumsum(used) - 1
+    vertex_count = int(used.sum())
+
+    vertices = np.zeros((vertex_count, 3), dtype=np.float32)
+    vertices[:, 0] = points[used, 0]  # X
+    vertices[:, 2] = points[used, 1]  # Z
+    faces = remap[triangles].astype(index_dtype(vertex_count))
+    return vertices, faces
+
+def merge_meshes(meshes):
+    """
+    Concatenates (vertices, faces) pairs into one mesh
+    """
+    meshes = [(vertices, faces) for vertices, faces in meshes if len(vertices) > 0 and len(faces) > 0]
+    if not meshes:
+        return [], []
+    if len(meshes) == 1:
+        return meshes[0]
+    offsets = np.cumsum([0] + [len(vertices) for vertices, _faces in meshes[:-1]])
+    vertices = np.concatenate([vertices for vertices, _faces in meshes])
+    dtype = index_dtype(len(vertices))
+    faces = np.concatenate([faces.astype(dtype) + dtype.type(offset) for (_vertices, faces), offset in zip(meshes, offsets)])
+    return vertices, faces
+
+def sampling_grid(poly: Polygon, interior_spacing):
+    """
+    X and Y coordinates of the regular grid interior points are sampled from
+    """
+    minx, miny, maxx, maxy = poly.bounds
+    x_points = np.arange(minx + interior_spacing, maxx, interior_spacing)
+    y_points = np.arange(miny + interior_spacing, maxy, interior_spacing)
+    return x_points, y_points
+
+def graded_levels(interior_spacing, max_spacing):
+    """
+    Number of times a graded mesh can double interior_spacing within max_spacing
+    """
+    if max_spacing and max_spacing > interior_spacing:
+        return int(np.floor(np.log2(max_spacing / interior_spacing)))
+    return 0
+
+def sample_interior_points(poly: Polygon, interior_spacing, chunk_size=1000000, check_cancelled=None):
+    """
+    Sample a regular grid over the polygon bounds and keep the points inside it.
+    The grid is tested in batches against a prepared geometry instead of
+    point by point. check_cancelled (if given) is called between batches and
+    may raise to abort.
+    """
+    x_points, y_points = sampling_grid(poly, interior_spacing)
+
+    if len(x_points) == 0 or len(y_points) == 0:
+        return np.empty((0, 2))
+
+    shapely.prepare(poly)
+
+    # Test whole columns of the grid at once, keeping the x-major order
+    # of the original nested loop
+    columns_per_chunk = max(1, chunk_size // len(y_points))
+    inside_points = []
+    for start in range(0, len(x_points), columns_per_chunk):
+        if check_cancelled:
+            check_cancelled()
+        grid_x, grid_y = np.meshgrid(x_points[start:start + columns_per_chunk], y_points, indexing='ij')
+        grid_x = grid_x.ravel()
+        grid_y = grid_y.ravel()
+        inside = shapely.contains_xy(poly, grid_x, grid_y)
+        inside_points.append(np.column_stack((grid_x[inside], grid_y[inside])))
+
+    return np.concatenate(inside_points)
+
+def boundary_points(poly: Polygon):
+    """
+    All exterior and hole vertices of a polygon as one (N, 2) array
+    """
+    rings = [poly.exterior] + list(poly.interiors)
+    return np.concatenate([np.array(ring.coords[:-1]) for ring in rings])
+
+def sample_graded_interior_points(poly: Polygon, interior_spacing, max_spacing, grading=DEFAULT_GRADING, check_cancelled=None):
+    """
+    Interior points that are interior_spacing apart near the boundary and
+    coarsen with distance from it, doubling the spacing once points are
+    grading spacings away, up to max_spacing. Points are taken from the same
+    grid sample_interior_points uses, refined quadtree-style so the fine
+    spacing is only ever generated near the boundary.
+    """
+    levels = graded_levels(interior_spacing, max_spacing)
+    if levels == 0:
+        return sample_interior_points(poly, interior_spacing, check_cancelled=check_cancelled)
+
+    x_points, y_points = sampling_grid(poly, interior_spacing)
+    x_count = len(x_points)
+    y_count = len(y_points)
+    if x_count == 0 or y_count == 0:
+        return np.empty((0, 2))
+
+    # Distance to the boundary, measured to the (densified) boundary vertices
+    boundary_tree = cKDTree(boundary_points(poly))
+
+    # Grid indices of the coarsest level, refined cell by cell towards the boundary
+    step = 2 ** levels
+    grid_x, grid_y = np.meshgrid(np.arange(0, x_count, step), np.arange(0, y_count, step), indexing='ij')
+    grid_x = grid_x.ravel()
+    grid_y = grid_y.ravel()
+
+    kept = []
+    for level in range(levels, -1, -1):
+        if check_cancelled:
+            check_cancelled()
+        step = 2 ** level
+        spacing = interior_spacing * step
+        x = x_points[grid_x]
+        y = y_points[grid_y]
+        distance, _index = boundary_tree.query(np.column_stack((x, y)))
+
+        if level == 0:
+            kept.append(grid_x * y_count + grid_y)
+            break
+
+        threshold = grading * spacing
+        far = distance >= threshold
+        kept.append(grid_x[far] * y_count + grid_y[far])
+
+        # Split every cell that may hold points closer than the threshold
+        # (a cell spans one diagonal from its lower-left corner)
+        split = distance < threshold + spacing * np.sqrt(2)
+        half = step // 2
+        grid_x = np.concatenate([grid_x[split] + dx * half for dx in (0, 1) for dy in (0, 1)])
+        grid_y = np.concatenate([grid_y[split] + dy * half for dx in (0, 1) for dy in (0, 1)])
+        inside_grid = (grid_x < x_count) & (grid_y < y_count)
+        grid_x = grid_x[inside_grid]
+        grid_y = grid_y[inside_grid]
+
+    # Same x-major order as the uniform grid
+    keys = np.unique(np.concatenate(kept))
+    x = x_points[keys // y_count]
+    y = y_points[keys % y_count]
+
+    shapely.prepare(poly)
+    inside = shapely.contains_xy(poly, x, y)
+    return np.column_stack((x[inside], y[inside]))
+
+def filter_triangles_inside(poly: Polygon, points, triangles):
+    """
+    Keep the triangles whose centroid lies inside the polygon, flipping their
+    winding to counter-clockwise
+    """
+    centroids = points[triangles].mean(axis=1)
+    shapely.prepare(poly)
+    inside = shapely.contains_xy(poly, centroids[:, 0], centroids[:, 1])
+    return triangles[inside][:, [0, 2, 1]]
+
+def core_grid_cells(poly: Polygon, x_nodes, y_nodes, margin):
+    """
+    Cells of the grid with corners x_nodes × y_nodes that lie at least
+    margin inside the polygon, as a boolean (x, y) mask, or None if there
+    are none
+    """
+    if len(x_nodes) < 2 or len(y_nodes) < 2:
+        return None
+    inner = poly.buffer(-margin)
+    if inner.is_empty:
+        return None
+
+    shapely.prepare(inner)
+    grid_x, grid_y = np.meshgrid(x_nodes, y_nodes, indexing='ij')
+    inside = shapely.contains_xy(inner, grid_x, grid_y)
+    # Every point of a cell is within one diagonal of a corner, so cells with
+    # all four corners in the inner polygon keep clear of the boundary
+    cells = inside[:-1, :-1] & inside[1:, :-1] & inside[:-1, 1:] & inside[1:, 1:]
+    return cells if cells.any() else None
+
+def grid_cell_triangles(cells, node_index):
+    """
+    Two triangles for every cell in the mask, wound like filter_triangles_inside
+    """
+    cell_x, cell_y = np.nonzero(cells)
+    n00 = node_index[cell_x, cell_y]
+    n10 = node_index[cell_x + 1, cell_y]
+    n01 = node_index[cell_x, cell_y + 1]
+    n11 = node_index[cell_x + 1, cell_y + 1]
+    return np.concatenate([
+        np.column_stack((n00, n11, n10)),
+        np.column_stack((n00, n01, n11))
+    ])
+
+def triangulate_with_core(poly: Polygon, outline, interior_points, x_points, y_points, interior_spacing, step, cells):
+    """
+    Hybrid triangulation: the core cells of the grid made of every step-th
+    x_points/y_points node get fixed triangles, and Delaunay only runs over
+    the band of points between the core and the boundary.
+
+    No other point lies within half a cell of the core's outer edges (the
+    boundary is kept a margin away and finer points next to the core are
+    dropped), so every such edge is in the band's Delaunay triangulation.
+    Band triangles therefore never cross the core, and the ones covering it
+    are discarded. Returns the points and triangles.
+    """
+    x_nodes = x_points[::step]
+    y_nodes = y_points[::step]
+    x_count, y_count = len(x_nodes), len(y_nodes)
+
+    # Core nodes, and those with core cells all around (left out of the Delaunay)
+    padded = np.pad(cells, 1)
+    core_nodes = padded[:-1, :-1] | padded[1:, :-1] | padded[:-1, 1:] | padded[1:, 1:]
+    inner_nodes = padded[:-1, :-1] & padded[1:, :-1] & padded[:-1, 1:] & padded[1:, 1:]
+    perimeter_nodes = core_nodes & ~inner_nodes
+
+    # Cells in or next to the core, indexed by their lower-left node
+    padded = np.pad(cells, 2)
+    near_core = np.zeros((x_count, y_count), dtype=bool)
+    for dx in range(3):
+        for dy in range(3):
+            near_core |= padded[1 + dx:1 + dx + x_count, 1 + dy:1 + dy + y_count]
+
+    # Interior points that are core nodes are added below, and points between
+    # grid nodes next to the core would crowd its edges
+    fine_x = np.rint((interior_points[:, 0] - x_points[0]) / interior_spacing).astype(np.intp)
+    fine_y = np.rint((interior_points[:, 1] - y_points[0]) / interior_spacing).astype(np.intp)
+    node_x, node_y = fine_x // step, fine_y // step
+    on_node = (fine_x % step == 0) & (fine_y % step == 0)
+    drop = np.where(on_node, core_nodes[node_x, node_y], near_core[node_x, node_y])
+    band_interior = interior_points[~drop]
+
+    grid_x, grid_y = np.meshgrid(x_nodes, y_nodes, indexing='ij')
+    perimeter_points = np.column_stack((grid_x[perimeter_nodes], grid_y[perimeter_nodes]))
+    inner_points = np.column_stack((grid_x[inner_nodes], grid_y[inner_nodes]))
+    band_points = np.concatenate([outline, band_interior, perimeter_points])
 
-def triangulate_polygon(poly: Polygon, boundary_spacing=1.0, interior_spacing=3.0):
+    node_index = np.full((x_count, y_count), -1, dtype=np.intp)
+    band_count = len(band_points)
+    node_index[perimeter_nodes] = np.arange(band_count - len(perimeter_points), band_count)
+    node_index[inner_nodes] = np.arange(band_count, band_count + len(inner_points))
+
+    # Delaunay over the band, dropping the triangles that span the core
+    tri = Triangulation(band_points[:, 0], band_points[:, 1])
+    centroids = band_points[tri.triangles].mean(axis=1)
+    cell_x = np.floor((centroids[:, 0] - x_nodes[0]) / (x_nodes[1] - x_nodes[0])).astype(np.intp)
+    cell_y = np.floor((centroids[:, 1] - y_nodes[0]) / (y_nodes[1] - y_nodes[0])).astype(np.intp)
+    in_grid = (cell_x >= 0) & (cell_x < cells.shape[0]) & (cell_y >= 0) & (cell_y < cells.shape[1])
+    in_core = np.zeros(len(centroids), dtype=bool)
+    in_core[in_grid] = cells[cell_x[in_grid], cell_y[in_grid]]
+    band_triangles = filter_triangles_inside(poly, band_points, tri.triangles[~in_core])
+
+    points = np.concatenate([band_points, inner_points])
+    triangles = np.concatenate([band_triangles, grid_cell_triangles(cells, node_index)])
+    return points, triangles
+
+def triangulate_polygon(poly: Polygon, boundary_spacing=1.0, interior_spacing=3.0, max_spacing=None, grading=DEFAULT_GRADING, check_cancelled=None):
     """
-    Polygon triangulation using matplotlib's triangulation with densified boundaries
+    Polygon triangulation using matplotlib's triangulation with densified boundaries.
+    With a max_spacing larger than interior_spacing the interior is graded,
+    coarsening away from the boundary (see sample_graded_interior_points).
+    Grid cells well inside the polygon are triangulated directly, leaving
+    Delaunay to the band along the boundary (see triangulate_with_core).
+    check_cancelled is passed on to the interior samplers. Returns a
+    compact mesh (see compact_mesh).
     """
     if poly.is_empty:
         return [], []
@@ -68,18 +469,12 @@ def triangulate_polygon(poly: Polygon, boundary_spacing=1.0, interior_spacing=3.
         return [], []
     
     # Step 2: Create a dense grid of interior points
-    minx, miny, maxx, maxy = densified_poly.bounds
-    
-    # Create grid resolution based on interior spacing
-    x_points = np.arange(minx + interior_spacing, maxx, interior_spacing)
-    y_points = np.arange(miny + interior_spacing, maxy, interior_spacing)
-    
-    interior_points = []
-    for x in x_points:
-        for y in y_points:
-            point = Point(x, y)
-            if densified_poly.contains(point):
-                interior_points.append([x, y])
+    levels = graded_levels(interior_spacing, max_spacing)
+    if levels:
+        interior_points = sample_graded_interior_points(densified_poly, interior_spacing, max_spacing, grading, check_cancelled)
+    else:
+        interior_points = sample_interior_points(densified_poly, interior_spacing, check_cancelled=check_cancelled)
+    interior_points = interior_points.reshape(-1, 2)
     
     # Step 3: Add hole boundaries (densified)
     hole_points = []
@@ -89,44 +484,115 @@ def triangulate_polygon(poly: Polygon, boundary_spacing=1.0, interior_spacing=3.
             if len(hole_coords) >= 3:
                 hole_points.extend(hole_coords.tolist())
     
-    # Step 4: Combine all points
-    all_boundary_points = exterior.tolist()
+    # Step 4: Combine the boundary points
+    outline = exterior
     if hole_points:
-        all_boundary_points.extend(hole_points)
-    if interior_points:
-        all_boundary_points.extend(interior_points)
-    
-    all_points = np.array(all_boundary_points)
+        outline = np.concatenate([exterior, np.array(hole_points)])
     
-    print(f"triangulation: {len(exterior)} exterior, {len(hole_points)} hole, {len(interior_points)} interior points")
+    # Step 5: Find the grid cells far enough inside to skip Delaunay. Graded
+    # meshes keep the core (and the cells around it) where no cell is split.
+    step = 2 ** levels
+    cell_spacing = interior_spacing * step
+    margin = max(cell_spacing, boundary_spacing) + cell_spacing
+    if levels:
+        margin += (grading + np.sqrt(2) + 1) * cell_spacing
+    x_points, y_points = sampling_grid(densified_poly, interior_spacing)
+    cells = core_grid_cells(densified_poly, x_points[::step], y_points[::step], margin)
     
-    # Step 5: Create triangulation
-    tri = Triangulation(all_points[:, 0], all_points[:, 1])
+    # Step 6: Create triangulation, keeping the triangles inside the polygon
+    if check_cancelled:
+        check_cancelled()
+    if cells is not None:
+        all_points, valid_triangles = triangulate_with_core(poly, outline, interior_points, x_points, y_points, interior_spacing, step, cells)
+    else:
+        all_points = np.concatenate([outline, interior_points])
+        tri = Triangulation(all_points[:, 0], all_points[:, 1])
+        valid_triangles = filter_triangles_inside(poly, all_points, tri.triangles)
     
-    # Step 6: Filter triangles to ensure they're inside the polygon
-    triangles = tri.triangles
-    valid_triangles = []
-    
-    for triangle in triangles:
-        # Check if triangle centroid is inside polygon
-        triangle_points = all_points[triangle]
-        centroid = np.mean(triangle_points, axis=0)
-        
-        if poly.contains(Point(centroid)):
-            # Ensure counter-clockwise winding
-            valid_triangles.append([triangle[0], triangle[2], triangle[1]])
-    
-    if not valid_triangles:
+    if len(valid_triangles) == 0:
         return [], []
     
-    # Convert to 3D vertices
-    vertices = np.zeros((len(all_points), 3))
-    vertices[:, 0] = all_points[:, 0]  # X
-    vertices[:, 1] = 0.0               # Y
-    vertices[:, 2] = all_points[:, 1]  # Z
-    
-    faces = np.array(valid_triangles)
-    
-    print(f"    Robust triangulation result: {len(vertices)} vertices, {len(faces)} triangles")
+    # Convert to 3D vertices, leaving out points no triangle kept
+    vertices, faces = compact_mesh(all_points, valid_triangles)
     return vertices, faces
 
+def terrain_errors(points, heights, triangles, heights_at):
+    """
+    Largest vertical distance between each planar triangle and the terrain,
+    measured at ERROR_SAMPLE_WEIGHTS. Returns the errors and, for every
+    triangle, the sample point where its error is largest.
+    """
+    corners = points[triangles]
+    # (triangles, samples, 2) positions and planar heights of every sample
+    samples = np.einsum('sk,tkd->tsd', ERROR_SAMPLE_WEIGHTS, corners)
+    planar = heights[triangles] @ ERROR_SAMPLE_WEIGHTS.T
+    terrain = heights_at(samples[:, :, 0].ravel(), samples[:, :, 1].ravel()).reshape(planar.shape)
+
+    deviation = np.abs(terrain - planar)
+    worst = deviation.argmax(axis=1)
+    rows = np.arange(len(triangles))
+    return deviation[rows, worst], samples[rows, worst]
+
+def max_terrain_error(vertices, faces, heights_at):
+    """
+    Largest terrain error of a flat (Y = 0) mesh from triangulate_polygon
+    """
+    points = vertices[:, [0, 2]]
+    heights = heights_at(points[:, 0], points[:, 1])
+    errors, _worst_points = terrain_errors(points, heights, faces, heights_at)
+    return float(errors.max()) if len(errors) else 0.0
+
+def longest_edges(points, triangles):
+    corners = points[triangles]
+    edges = corners - np.roll(corners, 1, axis=1)
+    return np.sqrt((edges ** 2).sum(axis=2)).max(axis=1)
+
+def triangulate_polygon_adaptive(poly: Polygon, heights_at, tolerance, boundary_spacing=1.0, min_spacing=0.25, max_spacing=3.2, check_cancelled=None):
+    """
+    Terrain-aware triangulation. Starts from a coarse graded mesh and keeps
+    inserting the worst sample point of every triangle whose plane strays
+    from heights_at(x, z) by more than tolerance, until every triangle fits
+    or is too small to split (longest edge under twice min_spacing).
+    check_cancelled is called before every pass and may raise to abort.
+    Returns vertices, faces and the largest error left.
+    """
+    if poly.is_empty:
+        return [], [], 0.0
+
+    densified_poly = densify_polygon(poly, boundary_spacing)
+    outline = boundary_points(densified_poly)
+    if len(densified_poly.exterior.coords) - 1 < 3:
+        return [], [], 0.0
+
+    # Start from the coarsest spacing that halves down to about the boundary
+    # spacing (or min_spacing, if that is coarser)
+    finest_spacing = max(boundary_spacing, min_spacing)
+    max_spacing = max(max_spacing, finest_spacing)
+    start_spacing = max_spacing / 2 ** np.floor(np.log2(max_spacing / finest_spacing))
+    interior_points = sample_graded_interior_points(densified_poly, start_spacing, max_spacing, ADAPTIVE_START_GRADING, check_cancelled)
+    points = np.concatenate([outline, interior_points.reshape(-1, 2)])
+    heights = heights_at(points[:, 0], points[:, 1])
+
+    for _pass in range(MAX_REFINEMENT_PASSES + 1):
+        if check_cancelled:
+            check_cancelled()
+        tri = Triangulation(points[:, 0], points[:, 1])
+        triangles = filter_triangles_inside(poly, points, tri.triangles)
+        if len(triangles) == 0:
+            return [], [], 0.0
+
+        errors, worst_points = terrain_errors(points, heights, triangles, heights_at)
+        refine = (errors > tolerance) & (longest_edges(points, triangles) >= 2 * min_spacing)
+        if _pass == MAX_REFINEMENT_PASSES or not refine.any():
+            break
+
+        # Neighbours share edge midpoints, so drop repeated insertions
+        new_points = np.unique(worst_points[refine], axis=0)
+        points = np.concatenate([points, new_points])
+        heights = np.concatenate([heights, heights_at(new_points[:, 0], new_points[:, 1])])
+
+    # Drop points left outside the polygon's triangles (e.g. in holes)
+    vertices, faces = compact_mesh(points, triangles)
+
+    max_error = float(errors.max())
+    return vertices, faces, max_error
@@ -0,0 +1,622 @@
+import os
+import json
+import math
+import uuid
+import shutil
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lib.cache import MeshCache, OutputIndex, DEFAULT_CACHE_SIZE, MESH_CACHE_VERSION, geometry_hash, file_signature
+from lib.export import make_folder, export_obj, export_mat, export_glb, merge_glb
+from lib.heightmap import read_raw_heightmap, map_raw_heightmap, map_mesh_to_heightmap, terrain_sampler
+from lib.mesh import path_length, path_to_polygon, simplify_polygon, polygon_parts, clip_to_tiles, merge_meshes, triangulate_polygon, triangulate_polygon_adaptive, max_terrain_error, DEFAULT_GRADING
+from lib.report import RunReport, measure, REPORT_FILENAME
+from lib.surfaces import parse_gpl_palette, match_surface
+from lib.svg import subtract_higher_layers
+
+max_height_value = 65535
+# largest distance (in SVG units) simplified outlines may stray from the sampled path
+DEFAULT_SIMPLIFY_TOLERANCE = 0.01
+# coarsest interior spacing the graded mesher may reach, per surface
+GRADED_MAX_SPACING = {
+  "green": 0.6,
+  "sand": 0.6,
+  "fringe": 0.8,
+  "tee": 0.8,
+  "river": 0.8,
+  "water": 2.0
+}
+DEFAULT_GRADED_MAX_SPACING = 3.2
+MESHERS = ("graded", "uniform", "adaptive")
+# how far (in world height units) adaptive meshes may stray from the terrain
+DEFAULT_TERRAIN_TOLERANCE = 0.05
+# LOD meshes are re-triangulated with coarser spacing until they are within
+# this factor of their target triangle count, trying at most LOD_ATTEMPTS times
+LOD_SLACK = 1.1
+LOD_ATTEMPTS = 3
+# lists the tiles (and their files) of a tiled run, inside the job folder
+TILE_MANIFEST = "tiles.json"
+# obj writes an OBJ and MTL per layer, glb a binary glTF per layer
+MESH_FORMATS = ("obj", "glb")
+# every layer of a single file run, one node per layer
+COURSE_GLB = "course.glb"
+
+# heightmap and cancel event shared by every layer generated in a pool worker process
+_worker_heightmap = None
+_worker_cancel_event = None
+
+class Cancelled(Exception):
+  """
+  Raised inside a job once its cancel event has been set
+  """
+
+def cancel_checker(cancel_event):
+  """
+  Function raising Cancelled once cancel_event is set (None without an event)
+  """
+  if cancel_event is None:
+    return None
+
+  def check_cancelled():
+    if cancel_event.is_set():
+      raise Cancelled("Job cancelled")
+
+  return check_cancelled
+
+def job_folder(output_path):
+  """
+  Unique folder inside output_path for the files of one run
+  """
+  return os.path.join(output_path, f"meshery-{uuid.uuid4()}")
+
+def build_layers(svg_info, surface_map, debug_log=print, cache=None, simplify_tolerance=DEFAULT_SIMPLIFY_TOLERANCE, check_cancelled=None):
+  """
+  Samples every SVG path into a polygon tagged with its surface, then drops
+  the samples that lie within simplify_tolerance of a straighter outline.
+  Paths whose data, transform and fill are unchanged reuse the cached polygon.
+  """
+  layers = []
+
+  layer_index = 0
+  for layer in svg_info['layers']:
+    if check_cancelled:
+      check_cancelled()
+    surface, color = match_surface(layer['attr'], surface_map)
+
+    if (surface == None or color == None):
+      raise ValueError(f"Unable to determine surface type based on assigned fill color! ({layer['attr']})")
+
+    poly = None
+    if cache:
+      layer_key = cache.layer_key(layer, simplify_tolerance=simplify_tolerance)
+      poly = cache.get_polygon(layer_key)
+
+    if poly is not None:
+      debug_log(f"Processing surface: {surface}, unchanged outline")
+    else:
+      num_points = max(int(path_length(layer['path'])) * 20, 100)
+      num_points = min(num_points, 10000)
+      poly = simplify_polygon(path_to_polygon(layer['path'], num_points), simplify_tolerance)
+      if cache:
+        cache.put_polygon(layer_key, poly)
+
+      debug_log(f"Processing surface: {surface}, {num_points} points, {len(poly.exterior.coords) - 1} after simplifying")
+
+    layers.append({
+      "index": layer_index,
+      "polygon": poly,
+      "attr": layer['attr'],
+      "label": surface,
+      "surface": surface,
+      "color": color
+    })
+
+    layer_index += 1
+
+  return layers
+
+def layer_spacing(surface, area):
+  """
+  Boundary and interior triangulation spacing for a surface
+  """
+  boundary_spacing = 0.5
+  interior_spacing = 0.8
+  if area < 1500:
+    interior_spacing = 0.25
+  if surface == "sand" or surface == "green":
+    interior_spacing = 0.15
+  if surface == "water":
+    interior_spacing = 0.5
+  if surface == "river":
+    interior_spacing = 0.2
+  return boundary_spacing, interior_spacing
+
+def layer_max_spacing(surface, interior_spacing, mesher="graded"):
+  """
+  Coarsest interior spacing for a surface, or None for a uniform interior
+  """
+  if mesher == "uniform":
+    return None
+  return max(GRADED_MAX_SPACING.get(surface, DEFAULT_GRADED_MAX_SPACING), interior_spacing)
+
+def layer_task(layer, output_path, svg_width, svg_height, height_scale, interpolation="bilinear", precision=6, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, mesher="graded", grading=DEFAULT_GRADING, terrain_tolerance=DEFAULT_TERRAIN_TOLERANCE, lods=(), tile=None, mesh_format="obj", quantize=False):
+  """
+  Everything a (possibly separate) process needs to generate one layer, or
+  the part of it inside one tile (column, row, bounds, polygon). Spacing
+  always follows the whole layer so tiles match the untiled mesh.
+  """
+  boundary_spacing, interior_spacing = layer_spacing(layer['surface'], layer['polygon'].area)
+  max_spacing = layer_max_spacing(layer['surface'], interior_spacing, mesher)
+  polygon = layer['polygon']
+  if tile:
+    column, row, bounds, polygon = tile
+    tile = {"column": column, "row": row, "bounds": list(bounds)}
+  return {
+    "index": layer['index'],
+    "label": layer['label'],
+    "surface": layer['surface'],
+    "color": layer['color'],
+    "polygon": polygon,
+    "tile": tile,
+    "boundary_spacing": boundary_spacing,
+    "interior_spacing": interior_spacing,
+    "max_spacing": max_spacing,
+    "grading": grading,
+    "terrain_tolerance": terrain_tolerance if mesher == "adaptive" else None,
+    "lods": tuple(lods),
+    "output_path": output_path,
+    "svg_width": svg_width,
+    "svg_height": svg_height,
+    "height_scale": height_scale,
+    "interpolation": interpolation,
+    "precision": precision,
+    "mesh_format": mesh_format,
+    "quantize": quantize,
+    "cache_dir": cache_dir,
+    "cache_size": cache_size
+  }
+
+def triangulate_layer(task, messages, heightmap, check_cancelled=None):
+  """
+  2D triangulation of a layer, reused from the mesh cache when the polygon
+  and spacing (and for adaptive meshes, the terrain) match an earlier run.
+  Returns vertices, faces and, for adaptive meshes, the largest terrain
+  error (otherwise None).
+  """
+  heights_at = None
+  if task['terrain_tolerance']:
+    heights_at = terrain_sampler(heightmap, task['polygon'].bounds, task['svg_width'], task['svg_height'], task['height_scale'], task['interpolation'])
+
+  cache = None
+  if task.get('cache_dir'):
+    cache = MeshCache(task['cache_dir'], task['cache_size'])
+    params = {
+      "boundary_spacing": task['boundary_spacing'],
+      "interior_spacing": task['interior_spacing'],
+      "max_spacing": task['max_spacing'],
+      "grading": task['grading']
+    }
+    if heights_at:
+      params.update(terrain_tolerance=task['terrain_tolerance'], terrain=task.get('terrain'), height_scale=task['height_scale'], interpolation=task['interpolation'])
+    cache_key = cache.key(task['polygon'], **params)
+    cached = cache.get(cache_key)
+    if cached is not None:
+      messages.append(f"Using cached {task['label']} triangulation")
+      vertices, faces = cached
+      max_error = None
+      if heights_at:
+        max_error = max_terrain_error(vertices, faces, heights_at)
+        messages.append(f"  {task['label']} max terrain error {max_error:.4f} (tolerance {task['terrain_tolerance']:g})")
+      return vertices, faces, max_error
+
+  # Subtracting higher layers or clipping to a tile can leave several pieces
+  parts = polygon_parts(task['polygon'])
+  max_error = None
+  if heights_at:
+    messages.append(f"Generating {task['label']} polygons with spacing {task['interior_spacing']:g} to {task['max_spacing']:g} within {task['terrain_tolerance']:g} of the terrain")
+    meshes = []
+    max_error = 0.0
+    for part in parts:
+      part_vertices, part_faces, part_error = triangulate_polygon_adaptive(part, heights_at, task['terrain_tolerance'], task['boundary_spacing'], task['interior_spacing'], task['max_spacing'], check_cancelled)
+      meshes.append((part_vertices, part_faces))
+      max_error = max(max_error, part_error)
+    vertices, faces = merge_meshes(meshes)
+    messages.append(f"  {task['label']} max terrain error {max_error:.4f} (tolerance {task['terrain_tolerance']:g})")
+  else:
+    if task['max_spacing']:
+      messages.append(f"Generating {task['label']} polygons with spacing {task['interior_spacing']:g} to {task['max_spacing']:g}")
+    else:
+      messages.append(f"Generating {task['label']} polygons with spacing {task['interior_spacing']:g}")
+    vertices, faces = merge_meshes(
+      triangulate_polygon(part, task['boundary_spacing'], task['interior_spacing'], task['max_spacing'], task['grading'], check_cancelled)
+      for part in parts
+    )
+
+  if cache and len(vertices) > 0 and len(faces) > 0:
+    cache.put(cache_key, vertices, faces)
+
+  return vertices, faces, max_error
+
+def lod_task(task, scale):
+  """
+  Copy of a layer task whose interior spacing is scale times coarser. The
+  boundary spacing is kept so every level shares the base mesh's outline.
+  """
+  lod = dict(task)
+  lod['interior_spacing'] = task['interior_spacing'] * scale
+  if task['max_spacing']:
+    lod['max_spacing'] = task['max_spacing'] * scale
+  if task['terrain_tolerance']:
+    # the error of a planar triangle grows with the square of its size
+    lod['terrain_tolerance'] = task['terrain_tolerance'] * scale ** 2
+  return lod
+
+def triangulate_lod(task, fraction, base_triangles, messages, heightmap, check_cancelled=None):
+  """
+  2D triangulation of a layer with about fraction of base_triangles. Only
+  the interior is coarsened, so the boundary matches the base mesh.
+  """
+  target = fraction * base_triangles
+  scale = 1 / math.sqrt(fraction)
+  for _attempt in range(LOD_ATTEMPTS):
+    vertices, faces, _max_error = triangulate_layer(lod_task(task, scale), messages, heightmap, check_cancelled)
+    if len(faces) <= target * LOD_SLACK:
+      break
+    # the outline band does not coarsen, so push the interior further
+    scale *= math.sqrt(len(faces) / target)
+  return vertices, faces
+
+def layer_name(task):
+  """
+  Base name of a layer's (or layer tile's) output files
+  """
+  if task.get('tile'):
+    return f"{task['surface']}_{task['index']}_tile_{task['tile']['column']}_{task['tile']['row']}"
+  return f"{task['surface']}_{task['index']}"
+
+def export_layer_mesh(task, vertices, faces, heightmap, filename, stages, check_cancelled=None, **details):
+  """
+  Conforms a 2D layer triangulation to the heightmap and writes it as an
+  OBJ or GLB, measuring both steps into stages
+  """
+  counts = {"vertices": len(vertices), "triangles": len(faces), **details}
+  with measure(stages, "height_conforming", **counts):
+    vertices = map_mesh_to_heightmap(vertices, heightmap, task['svg_width'], task['svg_height'], task['height_scale'], task['interpolation'])
+
+  with measure(stages, "export", **counts):
+    if task['mesh_format'] == "glb":
+      mesh = {
+        "name": os.path.splitext(os.path.basename(filename))[0],
+        "surface": task['surface'],
+        "color": task['color'],
+        "vertices": vertices,
+        "faces": faces
+      }
+      export_glb(filename, [mesh], task['quantize'], check_cancelled)
+      return
+    export_obj(filename, task['surface'], vertices, faces, task['precision'], check_cancelled)
+
+def generate_layer(task, heightmap, cancel_event=None):
+  """
+  Triangulates, conforms and exports a single layer, followed by its LOD
+  meshes. Log lines are returned with the result so they can be forwarded by
+  the calling process, along with the time, memory and mesh size of every
+  stage. Raises Cancelled soon after cancel_event is set.
+  """
+  check_cancelled = cancel_checker(cancel_event)
+  if check_cancelled:
+    check_cancelled()
+  messages = []
+  result = {
+    "index": task['index'],
+    "surface": task['surface'],
+    "name": layer_name(task),
+    "tile": task.get('tile'),
+    "output_key": task.get('output_key'),
+    "exported": False,
+    "files": [],
+    "max_error": None,
+    "vertices": 0,
+    "triangles": 0,
+    "stages": [],
+    "messages": messages
+  }
+  stages = result["stages"]
+
+  with measure(stages, "triangulation") as stage:
+    vertices, faces, result["max_error"] = triangulate_layer(task, messages, heightmap, check_cancelled)
+    stage.update(vertices=len(vertices), triangles=len(faces))
+
+  if len(vertices) == 0 or len(faces) == 0:
+    messages.append(f"  Skipping empty shape for {task['surface']}")
+    return result
+
+  # Create individual OBJ and MTL files (GLBs carry their own material)
+  name = layer_name(task)
+  extension = task['mesh_format']
+  mesh_filename = os.path.join(task['output_path'], f"{name}.{extension}")
+
+  # conform meshes to heightmap
+  messages.append(f"Conforming {task['label']} polygon to heightmap")
+  if extension == "obj":
+    mtl_filename = os.path.join(task['output_path'], f"{name}.mtl")
+    export_mat(mtl_filename, task['surface'], task.get('color', 'ffffff'))
+    result["files"].append(mtl_filename)
+  export_layer_mesh(task, vertices, faces, heightmap, mesh_filename, stages, check_cancelled)
+  result["files"].append(mesh_filename)
+  result["vertices"] = len(vertices)
+  result["triangles"] = len(faces)
+
+  # LOD meshes are written next to the base mesh and share its material
+  for level, fraction in enumerate(task['lods'], start=1):
+    with measure(stages, "triangulation", lod=level) as stage:
+      lod_vertices, lod_faces = triangulate_lod(task, fraction, len(faces), messages, heightmap, check_cancelled)
+      stage.update(vertices=len(lod_vertices), triangles=len(lod_faces))
+    if len(lod_vertices) == 0 or len(lod_faces) == 0:
+      messages.append(f"  Skipping empty LOD{level} for {task['surface']}")
+      continue
+    messages.append(f"  {task['label']} LOD{level}: {len(lod_faces)} triangles ({len(lod_faces) / len(faces):.0%} of the base mesh)")
+    lod_filename = os.path.join(task['output_path'], f"{name}_LOD{level}.{extension}")
+    export_layer_mesh(task, lod_vertices, lod_faces, heightmap, lod_filename, stages, check_cancelled, lod=level)
+    result["files"].append(lod_filename)
+
+  result["exported"] = True
+  return result
+
+def _init_worker(raw_path, resolution, cancel_event=None):
+  # Map the RAW file instead of pickling the heightmap into every worker
+  global _worker_heightmap, _worker_cancel_event
+  _worker_heightmap = map_raw_heightmap(raw_path, resolution)
+  _worker_cancel_event = cancel_event
+
+def _generate_layer_in_worker(task):
+  return generate_layer(task, _worker_heightmap, _worker_cancel_event)
+
+def generate_layers(tasks, raw_path, terrain_data, workers=None, cancel_event=None):
+  """
+  Yields the result of each layer task as it completes. With more than one
+  worker the layers are generated in a process pool that memory maps the
+  RAW file, otherwise they run in order in this process. cancel_event must
+  be a multiprocessing.Event when a pool is used; once it is set, running
+  layers raise Cancelled and queued ones are dropped.
+  """
+  if workers is None:
+    workers = os.cpu_count() or 1
+  workers = max(1, min(workers, len(tasks)))
+
+  if workers == 1:
+    for task in tasks:
+      yield generate_layer(task, terrain_data['data'], cancel_event)
+    return
+
+  executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(raw_path, terrain_data['resolution'], cancel_event))
+  try:
+    futures = [executor.submit(_generate_layer_in_worker, task) for task in tasks]
+    for future in as_completed(futures):
+      yield future.result()
+  finally:
+    # Don't start queued layers once a layer failed or the job was cancelled
+    executor.shutdown(wait=True, cancel_futures=True)
+
+def output_key(task, terrain_signature):
+  """
+  Identifies everything a layer's exported files depend on
+  """
+  params = {name: value for name, value in task.items() if name not in ("polygon", "output_path", "cache_dir", "cache_size", "terrain")}
+  return geometry_hash(task['polygon'], version=MESH_CACHE_VERSION, terrain=terrain_signature, **params)
+
+class TileManifest:
+  """
+  Collects the bounds ([min x, min z, max x, max z] in mesh units) and the
+  files of every tile in a tiled run
+  """
+
+  def __init__(self, tile_size):
+    self.tile_size = tile_size
+    self.tiles = {}
+
+  def add(self, task, files):
+    tile = task['tile']
+    entry = self.tiles.setdefault((tile['column'], tile['row']), {
+      "column": tile['column'],
+      "row": tile['row'],
+      "bounds": tile['bounds'],
+      "meshes": []
+    })
+    entry["meshes"].append({
+      "layer": task['index'],
+      "surface": task['surface'],
+      "files": [os.path.basename(file_path) for file_path in files]
+    })
+
+  def save(self, manifest_path, combined_file=None):
+    """
+    Writes the manifest. When the tiles were merged into combined_file, each
+    mesh lists the names of its nodes in that file instead.
+    """
+    tiles = [self.tiles[key] for key in sorted(self.tiles)]
+    for tile in tiles:
+      tile["meshes"].sort(key=lambda mesh: mesh["layer"])
+      if combined_file:
+        for mesh in tile["meshes"]:
+          mesh["nodes"] = [os.path.splitext(file_name)[0] for file_name in mesh["files"]]
+          mesh["files"] = [combined_file]
+    with open(manifest_path, 'w') as f:
+      json.dump({"tile_size": self.tile_size, "origin": [0, 0], "tiles": tiles}, f, indent=2)
+
+def run_job(svg_info, raw_path, output_path, height_value, palette_file, debug_log=print, progress=None, interpolation="bilinear", precision=6, workers=None, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, simplify_tolerance=DEFAULT_SIMPLIFY_TOLERANCE, mesher="graded", grading=DEFAULT_GRADING, terrain_tolerance=DEFAULT_TERRAIN_TOLERANCE, lods=(), tile_size=None, mesh_format="obj", quantize=False, single_file=False, cancel_event=None, report=None):
+  """
+  Converts a parsed SVG and RAW terrain into OBJ/MTL or GLB files (see
+  MESH_FORMATS) in output_path. GLB positions can be quantized to 16 bits,
+  and with single_file every layer goes into course.glb as its own node.
+  lods lists the triangle fractions (e.g. 0.5, 0.25) of the LOD meshes
+  written next to each layer's OBJ. With a tile_size, layers are clipped to
+  a grid of tile_size squares and every tile is meshed (and written) on its
+  own, with the tile bounds listed in tiles.json.
+  With a cache_dir, runs are incremental: unchanged SVG paths skip sampling,
+  layers whose polygon, settings and terrain all match the previous run are
+  copied from it, and 2D triangulations are reused so terrain-only changes
+  just re-sample heights.
+  Setting cancel_event (a multiprocessing.Event) stops the job within the
+  current sampling, triangulation or export step: Cancelled is raised and
+  the partial output folder is removed.
+  Timings, memory use and mesh sizes of every stage (and of each layer) are
+  written to report.json in output_path; pass a RunReport to include stages
+  measured before the job, like SVG parsing. Returns the number of exported
+  layers.
+  """
+  if tile_size is not None and tile_size <= 0:
+    raise ValueError("tile size must be greater than zero")
+  if any(not 0 < fraction < 1 for fraction in lods):
+    raise ValueError(f"LOD fractions must be between 0 and 1 ({', '.join(str(fraction) for fraction in lods)})")
+  if mesh_format not in MESH_FORMATS:
+    raise ValueError(f"Unknown mesh format {mesh_format} (expected one of {', '.join(MESH_FORMATS)})")
+  if (quantize or single_file) and mesh_format != "glb":
+    raise ValueError("quantized and single file output need the glb mesh format")
+  check_cancelled = cancel_checker(cancel_event)
+  if report is None:
+    report = RunReport()
+  report.info.update({
+    "svg": {"width": svg_info["width"], "height": svg_info["height"], "layers": len(svg_info["layers"])},
+    "settings": {
+      "interpolation": interpolation,
+      "precision": precision,
+      "workers": workers,
+      "cache": bool(cache_dir),
+      "simplify_tolerance": simplify_tolerance,
+      "mesher": mesher,
+      "grading": grading,
+      "terrain_tolerance": terrain_tolerance,
+      "lods": list(lods),
+      "tile_size": tile_size,
+      "mesh_format": mesh_format,
+      "quantize": quantize,
+      "single_file": single_file
+    }
+  })
+
+  cache = None
+  output_index = None
+  if cache_dir:
+    cache = MeshCache(cache_dir, cache_size)
+    output_index = OutputIndex(cache_dir)
+
+  debug_log("Parsing color palette...")
+  surface_map = parse_gpl_palette(palette_file)
+
+  with report.stage("path_sampling") as stage:
+    layers = build_layers(svg_info, surface_map, debug_log, cache, simplify_tolerance, check_cancelled)
+    stage["layers"] = len(layers)
+
+  debug_log(f"SVG successfully converted to polygons")
+  labels = {layer['index']: layer['label'] for layer in layers}
+  subtract_timings = {}
+  with report.stage("subtraction"):
+    layers = subtract_higher_layers(layers, subtract_timings)
+  for layer_index, seconds in sorted(subtract_timings.items()):
+    debug_log(f"  Subtracted higher layers from {labels[layer_index]}_{layer_index} in {seconds * 1000:.1f} ms")
+  debug_log(f"Subtracted overlapping layers in {sum(subtract_timings.values()):.2f}s")
+
+  if check_cancelled:
+    check_cancelled()
+
+  debug_log(f"Reading terrain data...")
+  with report.stage("terrain_read"):
+    terrain_data = read_raw_heightmap(raw_path, memmap=True)
+    terrain_signature = file_signature(raw_path)
+
+  max_world_height = (terrain_data['max'] / max_height_value) * height_value
+
+  debug_log(f"Creating output folder at: {output_path}")
+  make_folder(output_path)
+
+  try:
+    tasks = []
+    with report.stage("task_setup") as stage:
+      for layer in layers:
+        if layer['polygon'].is_empty:
+          debug_log(f"  Skipping empty polygon for {layer['surface']}")
+          continue
+        tiles = clip_to_tiles(layer['polygon'], tile_size) if tile_size else [None]
+        if tile_size:
+          debug_log(f"  Split {layer['label']}_{layer['index']} into {len(tiles)} tiles")
+        for tile in tiles:
+          task = layer_task(layer, output_path, svg_info["width"], svg_info["height"], max_world_height, interpolation, precision, cache_dir, cache_size, mesher, grading, terrain_tolerance, lods, tile, mesh_format, quantize)
+          task['terrain'] = terrain_signature
+          tasks.append(task)
+      stage["tasks"] = len(tasks)
+
+    # A layer counts as completed once all of its tiles are
+    layers_completed = 0
+    tasks_left = Counter(task['index'] for task in tasks)
+    exported_layers = set()
+    tile_manifest = TileManifest(tile_size) if tile_size else None
+    task_files = {}
+
+    def task_completed(task, files):
+      nonlocal layers_completed
+      if files:
+        task_files[layer_name(task)] = files
+        exported_layers.add(task['index'])
+        if tile_manifest:
+          tile_manifest.add(task, files)
+      tasks_left[task['index']] -= 1
+      if tasks_left[task['index']] == 0 and task['index'] in exported_layers:
+        layers_completed += 1
+        if progress:
+          progress(layers_completed)
+
+    pending = []
+    for task in tasks:
+      if check_cancelled:
+        check_cancelled()
+      if output_index:
+        task['output_key'] = output_key(task, terrain_signature)
+        files = output_index.reuse(task['output_key'], output_path)
+        if files:
+          debug_log(f"Reusing unchanged {layer_name(task)} from the previous run")
+          # Single file runs remove the copies once they are merged
+          if not single_file:
+            output_index.record(task['output_key'], files)
+          report.add_layer(layer_name(task), task, reused=True)
+          task_completed(task, files)
+          continue
+      pending.append(task)
+
+    pending_tasks = {layer_name(task): task for task in pending}
+    with report.stage("layer_generation", tasks=len(pending)):
+      for layer_result in generate_layers(pending, raw_path, terrain_data, workers, cancel_event):
+        for message in layer_result['messages']:
+          debug_log(message)
+        task = pending_tasks[layer_result['name']]
+        report.add_layer(layer_result['name'], task, layer_result)
+        # Single file runs remove the layer files once they are merged
+        if layer_result['exported'] and output_index and not single_file:
+          output_index.record(layer_result['output_key'], layer_result['files'])
+        task_completed(task, layer_result['files'] if layer_result['exported'] else None)
+
+    if output_index:
+      output_index.save()
+
+    if single_file:
+      # Nodes follow the layer order, with each layer's LODs after it
+      layer_files = [file_path for task in tasks for file_path in task_files.get(layer_name(task), [])]
+      with report.stage("merge", files=len(layer_files)):
+        merge_glb(os.path.join(output_path, COURSE_GLB), layer_files, check_cancelled)
+      for file_path in layer_files:
+        os.remove(file_path)
+      debug_log(f"Merged {len(layer_files)} meshes into {COURSE_GLB}")
+
+    if tile_manifest:
+      tile_manifest.save(os.path.join(output_path, TILE_MANIFEST), COURSE_GLB if single_file else None)
+      debug_log(f"Wrote {len(tile_manifest.tiles)} tiles to {TILE_MANIFEST}")
+
+    report.save(output_path, layers_completed=layers_completed)
+    debug_log(f"Wrote run report to {REPORT_FILENAME}")
+  except Cancelled:
+    # Leave no half-written job folder (or output index entries) behind
+    shutil.rmtree(output_path, ignore_errors=True)
+    debug_log(f"Job cancelled, removed {output_path}")
+    raise
+
+  return layers_completed
@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+from contextlib import contextmanager
+
+# bump when the layout of report.json changes
+REPORT_VERSION = 1
+# written into each job folder
+REPORT_FILENAME = "report.json"
+
+# how often the resident memory is sampled while a stage runs (seconds)
+RSS_SAMPLE_INTERVAL = 0.005
+
+# highest resident memory sampled so far in each measure() block that is
+# still open, and the thread sampling it while any block is open
+_open_stages = []
+_stages_lock = threading.Lock()
+_sampler = None
+
+def peak_rss():
+  """
+  Peak resident memory of this process over its whole lifetime in bytes,
+  or None if unavailable
+  """
+  try:
+    import resource
+  except ImportError:
+    counters = _windows_memory_counters()
+    return counters.PeakWorkingSetSize if counters else None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # kilobytes on Linux, bytes on macOS
+  return peak if sys.platform == "darwin" else peak * 1024
+
+def children_peak_rss():
+  """
+  Largest peak resident memory of any finished child process in bytes
+  (e.g. layer pool workers), or None if unavailable
+  """
+  try:
+    import resource
+  except ImportError:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+  return peak if sys.platform == "darwin" else peak * 1024
+
+def current_rss():
+  """
+  Resident memory of this process right now in bytes, or None if unavailable
+  """
+  if sys.platform.startswith("linux"):
+    try:
+      with open("/proc/self/statm", 'r') as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+      return None
+  if sys.platform == "darwin":
+    return _mach_resident_size()
+  if sys.platform == "win32":
+    counters = _windows_memory_counters()
+    return counters.WorkingSetSize if counters else None
+  return None
+
+def _windows_memory_counters():
+  try:
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+      _fields_ = [
+        ("cb", wintypes.DWORD),
+        ("PageFaultCount", wintypes.DWORD),
+        ("PeakWorkingSetSize", ctypes.c_size_t),
+        ("WorkingSetSize", ctypes.c_size_t),
+        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+        ("PagefileUsage", ctypes.c_size_t),
+        ("PeakPagefileUsage", ctypes.c_size_t)
+      ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+      return None
+    return counters
+  except (AttributeError, OSError):
+    return None
+
+def _mach_resident_size():
+  try:
+    import ctypes
+
+    class MachTaskBasicInfo(ctypes.Structure):
+      _fields_ = [
+        ("virtual_size", ctypes.c_uint64),
+        ("resident_size", ctypes.c_uint64),
+        ("resident_size_max", ctypes.c_uint64),
+        ("user_time", ctypes.c_int32 * 2),
+        ("system_time", ctypes.c_int32 * 2),
+        ("policy", ctypes.c_int32),
+        ("suspend_count", ctypes.c_int32)
+      ]
+
+    MACH_TASK_BASIC_INFO = 20
+    libc = ctypes.CDLL(None)
+    task = ctypes.c_uint32.in_dll(libc, "mach_task_self_")
+    info = MachTaskBasicInfo()
+    count = ctypes.c_uint32(ctypes.sizeof(info) // 4)
+    if libc.task_info(task, MACH_TASK_BASIC_INFO, ctypes.byref(info), ctypes.byref(count)) != 0:
+      return None
+    return info.resident_size
+  except (AttributeError, OSError, ValueError):
+    return None
+
+def _record_rss(rss):
+  if rss is None:
+    return
+  with _stages_lock:
+    for index, peak in enumerate(_open_stages):
+      if peak is not None and rss > peak:
+        _open_stages[index] = rss
+
+def _sample_rss(stop):
+  while not stop.wait(RSS_SAMPLE_INTERVAL):
+    _record_rss(current_rss())
+
+def _enter_stage():
+  global _sampler
+  rss = current_rss()
+  with _stages_lock:
+    _open_stages.append(rss)
+    first = len(_open_stages) == 1
+  if first and rss is not None:
+    stop = threading.Event()
+    thread = threading.Thread(target=_sample_rss, args=(stop,), daemon=True)
+    thread.start()
+    _sampler = (thread, stop)
+  return rss
+
+def _exit_stage():
+  global _sampler
+  _record_rss(current_rss())
+  with _stages_lock:
+    peak = _open_stages.pop()
+    last = not _open_stages
+  if last and _sampler:
+    thread, stop = _sampler
+    stop.set()
+    thread.join()
+    _sampler = None
+  return peak
+
+def _reset_after_fork():
+  # Pool workers forked during a stage have no sampling thread of their own
+  global _open_stages, _stages_lock, _sampler
+  _open_stages = []
+  _stages_lock = threading.Lock()
+  _sampler = None
+
+if hasattr(os, "register_at_fork"):
+  os.register_at_fork(after_in_child=_reset_after_fork)
+
+@contextmanager
+def measure(stages, name, **details):
+  """
+  Records the wall time, CPU time and memory of the enclosed block as a
+  stage dict appended to stages. The dict is yielded so counts (vertices,
+  triangles, ...) can be added to it inside the block.
+  start_rss is the process's resident memory when the block starts and
+  peak_rss the highest value sampled (every RSS_SAMPLE_INTERVAL) until it
+  ends, both None where the current resident memory can't be read.
+  """
+  stage = {"name": name, **details}
+  wall_start = time.perf_counter()
+  cpu_start = time.process_time()
+  stage["start_rss"] = _enter_stage()
+  try:
+    yield stage
+  finally:
+    stage["wall"] = time.perf_counter() - wall_start
+    stage["cpu"] = time.process_time() - cpu_start
+    stage["peak_rss"] = _exit_stage()
+    stages.append(stage)
+
+class RunReport:
+  """
+  Timings, memory and mesh sizes of one run, written as report.json
+  """
+
+  def __init__(self):
+    self.started = time.perf_counter()
+    self.cpu_started = time.process_time()
+    self.created = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    self.stages = []
+    self.layers = []
+    self.info = {}
+
+  def stage(self, name, **details):
+    return measure(self.stages, name, **details)
+
+  def add_layer(self, name, task, result=None, reused=False):
+    """
+    Adds a generated (or reused) layer with the stages measured for it
+    """
+    layer = {
+      "index": task['index'],
+      "surface": task['surface'],
+      "name": name,
+      "tile": task.get('tile'),
+      "reused": reused
+    }
+    if result:
+      layer.update({
+        "exported": result['exported'],
+        "vertices": result.get('vertices', 0),
+        "triangles": result.get('triangles', 0),
+        "max_error": result.get('max_error'),
+        "stages": result.get('stages', [])
+      })
+    self.layers.append(layer)
+
+  def stage_totals(self):
+    """
+    Wall and CPU time of each layer stage summed over all layers, with the
+    highest resident memory any of them reached
+    """
+    totals = {}
+    for layer in self.layers:
+      for stage in layer.get("stages", []):
+        total = totals.setdefault(stage["name"], {"name": stage["name"], "count": 0, "wall": 0.0, "cpu": 0.0, "peak_rss": None, "vertices": 0, "triangles": 0})
+        total["count"] += 1
+        total["wall"] += stage["wall"]
+        total["cpu"] += stage["cpu"]
+        if stage.get("peak_rss") is not None:
+          total["peak_rss"] = max(total["peak_rss"] or 0, stage["peak_rss"])
+        total["vertices"] += stage.get("vertices", 0)
+        total["triangles"] += stage.get("triangles", 0)
+    return list(totals.values())
+
+  def to_dict(self, **totals):
+    layer_peaks = [stage["peak_rss"] for layer in self.layers for stage in layer.get("stages", []) if stage.get("peak_rss")]
+    return {
+      "version": REPORT_VERSION,
+      "created": self.created,
+      **self.info,
+      "stages": self.stages,
+      "layer_stages": self.stage_totals(),
+      "layers": sorted(self.layers, key=lambda layer: (layer["index"], layer["name"])),
+      "total": {
+        "wall": time.perf_counter() - self.started,
+        "cpu": time.process_time() - self.cpu_started,
+        "peak_rss": peak_rss(),
+        "layer_peak_rss": max(layer_peaks, default=None),
+        "children_peak_rss": children_peak_rss(),
+        "vertices": sum(layer.get("vertices", 0) for layer in self.layers),
+        "triangles": sum(layer.get("triangles", 0) for layer in self.layers),
+        **totals
+      }
+    }
+
+  def save(self, output_path, **totals):
+    report_path = os.path.join(output_path, REPORT_FILENAME)
+    with open(report_path, 'w') as f:
+      json.dump(self.to_dict(**totals), f, indent=2)
+    return report_path
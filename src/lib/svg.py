@@ -1,26 +1,41 @@
-from svgpathtools import parse_path, svg2paths2, parser, path
+from svgpathtools import parse_path, parser, path
 import lxml.etree as ET
-import sys
+import time
+from shapely import STRtree, union_all
 
 SVG_NS = "http://www.w3.org/2000/svg"
 NSMAP = {"svg": SVG_NS}
+SVG_GROUP = f"{{{SVG_NS}}}g"
+SVG_PATH = f"{{{SVG_NS}}}path"
 
-def subtract_higher_layers(layers):
-  # Sort layers from topmost to bottom (reverse order for subtraction)
-  sorted_layers = layers[::-1]
+def subtract_higher_layers(layers, timings=None):
+  """
+  Removes the area covered by higher layers from each layer. Only the higher
+  layers that intersect it are subtracted, found through an STRtree, rather
+  than the union of everything above. When a timings dict is passed, the
+  seconds spent on each layer are stored in it by layer index.
+  """
+  polygons = [layer['polygon'] for layer in layers]
+  tree = STRtree(polygons)
   processed = []
-  union_above = None
-  for layer in sorted_layers:
-    poly = layer['polygon']
-    if union_above:
-      poly = poly.difference(union_above)
+  # Walk from topmost to bottom (reverse order for subtraction)
+  for i in range(len(layers) - 1, -1, -1):
+    start = time.perf_counter()
+    layer = layers[i]
+    poly = polygons[i]
+    # The union of the higher layers as given equals the union of their
+    # already-subtracted parts, so the original polygons can be used
+    above = [polygons[j] for j in sorted(tree.query(poly, predicate="intersects")) if j > i]
+    if above:
+      poly = poly.difference(union_all(above))
+    if timings is not None:
+      timings[layer.get('index', i)] = time.perf_counter() - start
     if poly.is_empty:
       continue
     new_layer = layer.copy()
     # new_layer['label'] = layer['label']
     new_layer['polygon'] = poly
     processed.append(new_layer)
-    union_above = poly if union_above is None else union_above.union(poly)
   # Return in original bottom-to-top order
   return processed[::-1]
 
@@ -41,55 +56,87 @@ def get_transform_str(element):
       
 def extract_paths_with_transforms(svg_filename, layer_id_filter = None):
   """
-  Yields tuples of (transformed Path, original attributes) for each <path> in the SVG.
+  Streams the SVG in a single pass. Returns the root <svg> attributes and the
+  transformed Paths, original attributes and applied transform strings for
+  each <path> (inside the layer_id_filter group when given). Elements are
+  discarded as soon as they have been handled, so large embedded <image>
+  payloads in other layers are not kept in memory.
   """
-  tree = ET.parse(svg_filename)
-  root = tree.getroot()
+  svg_attr = {}
   paths = []
   attrs = []
-  if layer_id_filter == None:
-    elements = root.xpath(".//svg:path", namespaces=NSMAP)
-  else:
-    elements = root.xpath(".//svg:g[@id='" + layer_id_filter + "']//svg:path", namespaces=NSMAP)
+  transforms = []
 
-  for path_elem in elements:
-    d = path_elem.attrib.get("d")
-    if not d:
+  depth = 0
+  # depth of the open layer_id_filter group while inside it
+  layer_depth = None
+  for event, elem in ET.iterparse(svg_filename, events=("start", "end"), huge_tree=True):
+    if event == "start":
+      if depth == 0:
+        svg_attr = dict(elem.attrib)
+      elif layer_depth is None and elem.tag == SVG_GROUP and elem.attrib.get("id") == layer_id_filter:
+        layer_depth = depth
+      depth += 1
       continue
-    orig_attrs = dict(path_elem.attrib)
-    # Compute the full transform (including all ancestor groups)
-    # transform_matrix = get_full_transform(path_elem)
-    # Parse the path data
-    parsed_path = parse_path(d)
-    # Flatten the 3x3 matrix into SVG's a,b,c,d,e,f for path.transform()
-    # a, c, e = transform_matrix[0, 0], transform_matrix[0, 1], transform_matrix[0, 2]
-    # b, d, f = transform_matrix[1, 0], transform_matrix[1, 1], transform_matrix[1, 2]
-
-    # print(f"path {orig_attrs.get('id')} is continuous? ", parsed_path.iscontinuous())
-    # print(f"path {orig_attrs.get('id')} is closed? ", parsed_path.isclosed())
-    if not parsed_path.isclosed():
-      print(f"Layer contained unclosed path! {orig_attrs.get('id')}")
-      sys.exit(1)
-
-    # assert callable(getattr(path, "transform", None)), "transform should be a method"
-
-    transform_str = get_transform_str(path_elem)
-    # path2 = Path.transform(a, b, c, d, e, f)
-    # Get a 3x3 transform matrix (for example, from svgpathtools.parser)
-    tf = parser.parse_transform(transform_str)
-
-    # Apply the transform using the module-level function
-    path2 = path.transform(parsed_path, tf)
-
-    paths.append(path2)
-    attrs.append(orig_attrs)
-    # yield path, orig_attrs
-  return paths, attrs
+
+    depth -= 1
+    if depth == 0:
+      break
+
+    if elem.tag == SVG_PATH and (layer_id_filter == None or layer_depth is not None):
+      transformed = transform_path_element(elem)
+      if transformed is not None:
+        paths.append(transformed[0])
+        attrs.append(transformed[1])
+        transforms.append(transformed[2])
+
+    if layer_depth == depth:
+      layer_depth = None
+
+    # Ancestors are still open (and keep their transforms), everything
+    # before this element has been handled and can be dropped
+    elem.clear()
+    while elem.getprevious() is not None:
+      del elem.getparent()[0]
+
+  return svg_attr, paths, attrs, transforms
+
+def transform_path_element(path_elem):
+  """
+  Returns the transformed Path, original attributes and applied transform
+  string of a <path> element, or None when it has no path data
+  """
+  d = path_elem.attrib.get("d")
+  if not d:
+    return None
+  orig_attrs = dict(path_elem.attrib)
+  # Compute the full transform (including all ancestor groups)
+  # transform_matrix = get_full_transform(path_elem)
+  # Parse the path data
+  parsed_path = parse_path(d)
+  # Flatten the 3x3 matrix into SVG's a,b,c,d,e,f for path.transform()
+  # a, c, e = transform_matrix[0, 0], transform_matrix[0, 1], transform_matrix[0, 2]
+  # b, d, f = transform_matrix[1, 0], transform_matrix[1, 1], transform_matrix[1, 2]
+
+  # print(f"path {orig_attrs.get('id')} is continuous? ", parsed_path.iscontinuous())
+  # print(f"path {orig_attrs.get('id')} is closed? ", parsed_path.isclosed())
+  if not parsed_path.isclosed():
+    raise ValueError(f"Layer contained unclosed path! {orig_attrs.get('id')}")
+
+  # assert callable(getattr(path, "transform", None)), "transform should be a method"
+
+  transform_str = get_transform_str(path_elem)
+  # path2 = Path.transform(a, b, c, d, e, f)
+  # Get a 3x3 transform matrix (for example, from svgpathtools.parser)
+  tf = parser.parse_transform(transform_str)
+
+  # Apply the transform using the module-level function
+  path2 = path.transform(parsed_path, tf)
+
+  return path2, orig_attrs, transform_str
 
 def svg_parse(svg_file, layer_id_filter=None):
-  _paths, _attrs, svg_attr = svg2paths2(svg_file)
-  
-  paths, attrs = extract_paths_with_transforms(svg_file, layer_id_filter)
+  svg_attr, paths, attrs, transforms = extract_paths_with_transforms(svg_file, layer_id_filter)
     
   # Get SVG viewBox dimensions
   vb = svg_attr.get('viewBox', None)
@@ -110,14 +157,13 @@ def svg_parse(svg_file, layer_id_filter=None):
   print(f"  SVG height: {result["height"]}")
 
   if (result["width"] < 1 or result["height"] < 1):
-    print(f"SVG file dimensions are invalid: {result["width"]}x{result["height"]}")
-    sys.exit(1)
-    return
+    raise ValueError(f"SVG file dimensions are invalid: {result["width"]}x{result["height"]}")
 
-  for path, attr in zip(paths, attrs):
+  for path, attr, transform_str in zip(paths, attrs, transforms):
     result["layers"].append({
       "id": attr.get("id"),
       "path": path,
-      "attr": attr
+      "attr": attr,
+      "transform": transform_str
     })
   return result
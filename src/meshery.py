@@ -1,9 +1,12 @@
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 
 from ui.window import UIWindow
 
 if __name__ == '__main__':
+    # Layer generation runs in a process pool, which frozen builds need to bootstrap
+    multiprocessing.freeze_support()
     # Create the Qt Application
     app = QApplication(sys.argv)
     # Create and show the form
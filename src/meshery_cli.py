@@ -0,0 +1,156 @@
+"""
+Headless batch mode: generates meshes for every job in a manifest without Qt.
+
+The manifest is a JSON list of jobs (or an object with a "jobs" list):
+
+  [
+    {"svg": "course.svg", "raw": "terrain.raw", "height_scale": 10.52, "output": "meshes"}
+  ]
+
+Relative paths are resolved against the manifest's folder. Each job writes a
+meshery-<uuid> folder inside its output folder, like the app does. The exit
+status is the number of failed jobs (0 when every job succeeded).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lib.cache import cache_folder, DEFAULT_CACHE_SIZE
+from lib.mesh import DEFAULT_GRADING
+from lib.pipeline import job_folder, run_job, DEFAULT_SIMPLIFY_TOLERANCE, DEFAULT_TERRAIN_TOLERANCE, MESHERS, MESH_FORMATS
+from lib.report import RunReport
+from lib.svg import svg_parse
+from lib.utils import resource_path
+
+# keep the status inside the range shells don't reserve for signals
+MAX_EXIT_STATUS = 100
+
+def load_manifest(manifest_path):
+  with open(manifest_path, 'r') as f:
+    manifest = json.load(f)
+  jobs = manifest.get("jobs", []) if isinstance(manifest, dict) else manifest
+
+  base_path = os.path.dirname(os.path.abspath(manifest_path))
+  parsed = []
+  for number, job in enumerate(jobs, start=1):
+    missing = [key for key in ("svg", "raw", "height_scale", "output") if key not in job]
+    if missing:
+      raise ValueError(f"Job {number} in {manifest_path} is missing {', '.join(missing)}")
+    parsed.append({
+      "name": job.get("name", os.path.splitext(os.path.basename(job["svg"]))[0]),
+      "svg": os.path.join(base_path, job["svg"]),
+      "raw": os.path.join(base_path, job["raw"]),
+      "height_scale": float(job["height_scale"]),
+      "output": os.path.join(base_path, job["output"])
+    })
+  return parsed
+
+def run_manifest_job(job, options):
+  """
+  Runs one manifest job, returning the folder its meshes were written to
+  """
+  def debug_log(message):
+    print(f"[{job['name']}] {message}", flush=True)
+
+  if job["height_scale"] <= 0:
+    raise ValueError("height scale must be greater than zero")
+
+  report = RunReport()
+  with report.stage("svg_parse"):
+    svg_info = svg_parse(job["svg"], "course")
+  output_path = job_folder(job["output"])
+
+  cache_dir = None
+  if not options["no_cache"]:
+    cache_dir = options["cache_dir"] or cache_folder(job["output"])
+
+  run_job(
+    svg_info,
+    job["raw"],
+    output_path,
+    job["height_scale"],
+    options["palette"],
+    debug_log=debug_log,
+    interpolation=options["interpolation"],
+    precision=options["precision"],
+    workers=options["layer_workers"],
+    cache_dir=cache_dir,
+    cache_size=options["cache_size"],
+    simplify_tolerance=options["simplify_tolerance"],
+    mesher=options["mesher"],
+    grading=options["grading"],
+    terrain_tolerance=options["terrain_tolerance"],
+    lods=options["lods"],
+    tile_size=options["tile_size"],
+    mesh_format=options["format"],
+    quantize=options["quantize"],
+    single_file=options["single_file"],
+    report=report
+  )
+  return output_path
+
+def parse_args(argv):
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("manifest", help="JSON file listing the jobs to run")
+  parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="courses generated at the same time (default: one per CPU)")
+  parser.add_argument("--layer-workers", type=int, default=1, help="processes used for the layers of each course (default: 1)")
+  parser.add_argument("--precision", type=int, default=6, help="decimals written for OBJ vertices (default: 6)")
+  parser.add_argument("--interpolation", choices=["bilinear", "bicubic"], default="bilinear", help="heightmap interpolation (default: bilinear)")
+  parser.add_argument("--simplify-tolerance", type=float, default=DEFAULT_SIMPLIFY_TOLERANCE, help="how far simplified outlines may stray from the SVG paths, 0 to disable (default: %(default)s)")
+  parser.add_argument("--mesher", choices=MESHERS, default=MESHERS[0], help="interior point layout: graded coarsens away from outlines, uniform keeps one spacing, adaptive refines only where the terrain needs it (default: %(default)s)")
+  parser.add_argument("--grading", type=float, default=DEFAULT_GRADING, help="spacings from the outline before the graded mesher doubles its spacing (default: %(default)s)")
+  parser.add_argument("--terrain-tolerance", type=float, default=DEFAULT_TERRAIN_TOLERANCE, help="largest height difference between adaptive meshes and the terrain (default: %(default)s)")
+  parser.add_argument("--lods", type=float, nargs="+", default=[], metavar="FRACTION", help="also write LOD meshes with these fractions of each layer's triangles, e.g. --lods 0.5 0.25")
+  parser.add_argument("--tile-size", type=float, help="split layers into tiles of this size (in SVG units) and write a mesh per tile, listed in tiles.json")
+  parser.add_argument("--format", choices=MESH_FORMATS, default=MESH_FORMATS[0], help="mesh files to write: OBJ and MTL, or binary glTF (default: %(default)s)")
+  parser.add_argument("--quantize", action="store_true", help="store GLB positions as 16-bit integers (KHR_mesh_quantization)")
+  parser.add_argument("--single-file", action="store_true", help="write every layer into one course.glb, a node per layer")
+  parser.add_argument("--cache-dir", help="folder for cached triangulations (default: .meshery-cache in each job's output folder)")
+  parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), help="cache size limit in MB (default: %(default)s)")
+  parser.add_argument("--no-cache", action="store_true", help="always re-triangulate every layer")
+  parser.add_argument("--palette", default=resource_path("data/palette.gpl"), help="GIMP palette mapping fill colors to surfaces")
+  return parser.parse_args(argv)
+
+def main(argv=None):
+  args = parse_args(argv)
+  jobs = load_manifest(args.manifest)
+  options = {
+    "palette": os.path.abspath(args.palette),
+    "interpolation": args.interpolation,
+    "precision": args.precision,
+    "layer_workers": args.layer_workers,
+    "cache_dir": os.path.abspath(args.cache_dir) if args.cache_dir else None,
+    "cache_size": args.cache_size * 1024 * 1024,
+    "no_cache": args.no_cache,
+    "simplify_tolerance": args.simplify_tolerance,
+    "mesher": args.mesher,
+    "grading": args.grading,
+    "terrain_tolerance": args.terrain_tolerance,
+    "lods": args.lods,
+    "tile_size": args.tile_size,
+    "format": args.format,
+    "quantize": args.quantize,
+    "single_file": args.single_file
+  }
+
+  failed = []
+  with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+    futures = {executor.submit(run_manifest_job, job, options): job for job in jobs}
+    for future in as_completed(futures):
+      job = futures[future]
+      try:
+        output_path = future.result()
+        print(f"[{job['name']}] OK: {output_path}", flush=True)
+      except Exception as e:
+        failed.append(job)
+        print(f"[{job['name']}] FAILED: {e}", file=sys.stderr, flush=True)
+
+  print(f"{len(jobs) - len(failed)} of {len(jobs)} jobs completed")
+  return min(len(failed), MAX_EXIT_STATUS)
+
+if __name__ == '__main__':
+  multiprocessing.freeze_support()
+  sys.exit(main())
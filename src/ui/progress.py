@@ -14,12 +14,19 @@ from PySide6.QtWidgets import (
   QStackedLayout,
   QWidget,
   QProgressBar,
-  QScrollArea
+  QPlainTextEdit
 )
-from PySide6.QtCore import (QObject, Signal, Slot, Qt, QThread)
+from PySide6.QtCore import (QObject, Signal, Slot, Qt, QThread, QTimer)
 from PySide6.QtGui import QPixmap
 
+# oldest log lines are dropped past this many
+LOG_MAX_LINES = 5000
+# log messages are collected and shown at most this often
+LOG_FLUSH_INTERVAL_MS = 250
+
 class UIProgress(QVBoxLayout):
+  cancelled = Signal()        # emit when the user cancels the job
+
   def __init__(self, parent=None):
     super(UIProgress, self).__init__(parent)
 
@@ -36,19 +43,21 @@ class UIProgress(QVBoxLayout):
     # self.title_label.setAlignment(Qt.AlignVCenter)
     self.addWidget(self.title_label)
 
-    self.scroll_area = QScrollArea()
-    self.scroll_area.setWidgetResizable(True) # Allows the widget inside to resize with the scroll area
+    self.log_view = QPlainTextEdit("Parsing svg...")
+    self.log_view.setReadOnly(True)
+    self.log_view.setMaximumBlockCount(LOG_MAX_LINES)
+    self.log_view.setStyleSheet("padding: 4px;background-color: #121212;color: #ffffff;font-family: Monaco;")
+    self.log_view.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+    self.log_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
 
-    self.debug_log_label = QLabel("Parsing svg...")
-    self.debug_log_label.setStyleSheet("padding: 4px;background-color: #121212;color: #ffffff;font-family: Monaco;")
-    self.debug_log_label.setAlignment(Qt.AlignBottom)
-    # self.debug_log_label.setFixedHeight(200)
-    self.debug_log_label.setWordWrap(True)
-    self.scroll_area.setWidget(self.debug_log_label)
-    self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-    self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+    self.addWidget(self.log_view)
 
-    self.addWidget(self.scroll_area)
+    # messages waiting for the next flush
+    self.pending_log = []
+    self.log_timer = QTimer()
+    self.log_timer.setSingleShot(True)
+    self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+    self.log_timer.timeout.connect(self.flush_log)
 
 
     # submit button
@@ -61,28 +70,43 @@ class UIProgress(QVBoxLayout):
     self.addWidget(self.cancel_button)    
 
   def cancel_work(self):
-    if self.worker:
-      self.worker.stop()
-    self.switch_layout(0)
+    # the window returns to the form once the worker has actually stopped
+    self.cancel_button.setDisabled(True)
+    self.cancel_button.setText("Cancelling...")
+    self.cancelled.emit()
 
   def setup_progress(self, steps = 0):
     self.progress_bar.setMaximum(steps)
     self.progress_bar.setValue(0)
+    self.cancel_button.setDisabled(False)
+    self.cancel_button.setText("Cancel Job")
 
   def update_progress(self, step = 0):
     self.progress_bar.setValue(step)
     self.title_label.setText(self.progress_bar.text())
 
   def on_finished(self, result):
-    # handle result (None if cancelled)
-    self.debug_log("Export completed successfully!")
+    # handle result (None if cancelled or failed)
+    if result is not None:
+      self.debug_log("Export completed successfully!")
+    self.flush_log()
     self.progress_bar.setValue(0)
     print("Finished!, result:", result)
 
   def debug_log(self, message):
-    print(message)
-    existing = self.debug_log_label.text()
-    self.debug_log_label.setText(f"{existing}{message}\n")
-    
-    vbar = self.scroll_area.verticalScrollBar()
+    # Batch messages so the log repaints a few times a second at most
+    self.pending_log.append(message)
+    if not self.log_timer.isActive():
+      self.log_timer.start()
+
+  def flush_log(self):
+    self.log_timer.stop()
+    if not self.pending_log:
+      return
+    text = "\n".join(self.pending_log)
+    self.pending_log = []
+    print(text)
+    self.log_view.appendPlainText(text)
+
+    vbar = self.log_view.verticalScrollBar()
     vbar.setValue(vbar.maximum())
@@ -14,6 +14,7 @@ from ui.header import UIHeader
 from ui.form import UIForm
 from ui.progress import UIProgress
 from ui.completed import UICompleted
+from lib.report import RunReport
 from lib.svg import svg_parse
 from lib.process import MeshWorker
 
@@ -42,6 +43,7 @@ class UIWindow(QDialog):
     self.stacked_layout.addWidget(form_widget)
 
     self.progress_screen = UIProgress()
+    self.progress_screen.cancelled.connect(self.on_cancel)
 
     job_widget = QWidget()
     job_widget.setLayout(self.progress_screen)
@@ -55,6 +57,9 @@ class UIWindow(QDialog):
 
     self.stacked_layout.setCurrentIndex(0)
     self.setLayout(main_layout)
+
+    self.worker = None
+    self.thread = None
   
 
   def on_restart_form(self):
@@ -71,7 +76,14 @@ class UIWindow(QDialog):
     self.stacked_layout.setCurrentIndex(1)
     
     print("Parsing SVG file...")
-    svg_info = svg_parse(svg_path, "course")
+    report = RunReport()
+    try:
+      with report.stage("svg_parse"):
+        svg_info = svg_parse(svg_path, "course")
+    except Exception as e:
+      self.stacked_layout.setCurrentIndex(0)
+      self.display_error(str(e))
+      return
     print(f"Layers: {len(svg_info['layers'])}")
     total_layers = len(svg_info['layers'])
     self.progress_screen.setup_progress(total_layers)
@@ -79,7 +91,7 @@ class UIWindow(QDialog):
     # self.progress_screen.update_progress(0)
 
     self.thread = QThread()
-    self.worker = MeshWorker(svg_info, raw_path, output_path, height_value)
+    self.worker = MeshWorker(svg_info, raw_path, output_path, height_value, report=report)
     self.worker.moveToThread(self.thread)
 
     # connect
@@ -99,8 +111,16 @@ class UIWindow(QDialog):
     self.thread.start()
   
   def on_finished(self, result):
-    self.stacked_layout.setCurrentIndex(2)
     self.progress_screen.on_finished(result)
+    if result is None:
+      # cancelled, or failed (the error is shown separately)
+      self.stacked_layout.setCurrentIndex(0)
+      return
+    self.stacked_layout.setCurrentIndex(2)
+
+  def on_cancel(self):
+    if self.worker:
+      self.worker.stop()
 
   def set_progress(self, value: int):
     self.progress_screen.update_progress(0)
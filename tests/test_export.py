@@ -0,0 +1,90 @@
+"""
+Checks that export_obj writes the same mesh as the original line-by-line
+OBJ writer.
+
+  python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from lib.export import export_obj
+
+
+def export_obj_per_line(obj_filename, surface, vertices, faces):
+  # The writer export_obj replaced, one f-string and write() per line
+  with open(obj_filename, 'w') as obj_file:
+    obj_file.write(f"# {surface} mesh\n")
+    obj_file.write(f"mtllib {os.path.basename(obj_filename)}\n")
+    obj_file.write(f"o {surface}\n")
+    obj_file.write(f"usemtl {surface}_material\n\n")
+    for vertex in vertices:
+      obj_file.write(f"v {vertex[0]:.6f} {vertex[1]:.6f} {vertex[2]:.6f}\n")
+    for face in faces:
+      obj_file.write(f"f {face[0] + 1} {face[1] + 1} {face[2] + 1}\n")
+
+
+def parse_obj(obj_filename):
+  vertices = []
+  faces = []
+  with open(obj_filename, 'r') as obj_file:
+    for line in obj_file:
+      if line.startswith("v "):
+        vertices.append([float(value) for value in line.split()[1:]])
+      elif line.startswith("f "):
+        faces.append([int(value) - 1 for value in line.split()[1:]])
+  return np.array(vertices), np.array(faces)
+
+
+def random_mesh(vertex_count, face_count, seed=0):
+  rng = np.random.default_rng(seed)
+  vertices = rng.uniform(-1000, 1000, (vertex_count, 3))
+  faces = rng.integers(0, vertex_count, (face_count, 3))
+  return vertices, faces
+
+
+class ExportObjTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(self.temp_dir.cleanup)
+
+  def export_both(self, vertices, faces, precision=6):
+    old_filename = os.path.join(self.temp_dir.name, "old.obj")
+    new_filename = os.path.join(self.temp_dir.name, "new.obj")
+    export_obj_per_line(old_filename, "rough", vertices, faces.astype(np.int64))
+    export_obj(new_filename, "rough", vertices, faces, precision)
+    return parse_obj(old_filename), parse_obj(new_filename)
+
+  def test_same_mesh_as_per_line_writer(self):
+    # More rows than one write block
+    vertices, faces = random_mesh(70000, 140000)
+    (old_vertices, old_faces), (new_vertices, new_faces) = self.export_both(vertices, faces)
+    np.testing.assert_array_equal(new_vertices, old_vertices)
+    np.testing.assert_array_equal(new_faces, old_faces)
+
+  def test_lower_precision_within_tolerance(self):
+    vertices, faces = random_mesh(1000, 2000)
+    for precision in (2, 4):
+      (old_vertices, old_faces), (new_vertices, new_faces) = self.export_both(vertices, faces, precision)
+      np.testing.assert_allclose(new_vertices, old_vertices, rtol=0, atol=0.5 * 10 ** -precision + 1e-6)
+      np.testing.assert_array_equal(new_faces, old_faces)
+
+  def test_small_index_types(self):
+    # The 1-based offset must not wrap around the largest index
+    for dtype, vertex_count in ((np.uint8, 256), (np.uint16, 65536)):
+      vertices, faces = random_mesh(vertex_count, 3 * vertex_count)
+      faces[0] = vertex_count - 1
+      (old_vertices, old_faces), (new_vertices, new_faces) = self.export_both(vertices.astype(np.float32), faces.astype(dtype))
+      np.testing.assert_array_equal(new_vertices, old_vertices)
+      np.testing.assert_array_equal(new_faces, old_faces)
+      self.assertEqual(new_faces.max(), vertex_count - 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
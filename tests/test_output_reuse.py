@@ -0,0 +1,72 @@
+"""
+Checks that layers exported by one run are reused by the next, including
+after a single-file run that removes its own layer files.
+
+  python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from lib.pipeline import job_folder, run_job
+from lib.report import RunReport
+from lib.svg import svg_parse
+
+PALETTE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "palette.gpl")
+# a rough covering the course with a green on top
+COURSE_SVG = """<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100">
+<g id="course">
+<path id="rough0" style="fill:#115b13;stroke:none" d="M 0,0 L 100,0 L 100,100 L 0,100 Z"/>
+<path id="green1" style="fill:#8efeb4;stroke:none" d="M 30,30 L 70,30 L 70,70 L 30,70 Z"/>
+</g>
+</svg>"""
+TERRAIN_RESOLUTION = 65
+
+
+class OutputReuseTest(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(self.temp_dir.cleanup)
+    self.svg_path = os.path.join(self.temp_dir.name, "course.svg")
+    with open(self.svg_path, 'w') as f:
+      f.write(COURSE_SVG)
+    self.raw_path = os.path.join(self.temp_dir.name, "terrain.raw")
+    x = np.linspace(0, 1, TERRAIN_RESOLUTION)
+    heights = 20000 + 10000 * np.sin(4 * x)[np.newaxis, :] * np.cos(3 * x)[:, np.newaxis]
+    heights.astype('<u2').tofile(self.raw_path)
+    self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+  def run_course(self, single_file=False):
+    """
+    Runs the job as GLB, returning (output folder, reused layer names)
+    """
+    report = RunReport()
+    output_path = job_folder(self.temp_dir.name)
+    svg_info = svg_parse(self.svg_path, "course")
+    run_job(svg_info, self.raw_path, output_path, 10.0, PALETTE_FILE, debug_log=lambda message: None, workers=1, cache_dir=self.cache_dir, mesh_format="glb", single_file=single_file, report=report)
+    reused = [layer["name"] for layer in report.to_dict()["layers"] if layer["reused"]]
+    return output_path, reused
+
+  def test_reuse_after_single_file_run(self):
+    first_path, reused = self.run_course()
+    self.assertEqual(reused, [])
+    layer_files = sorted(name for name in os.listdir(first_path) if name.endswith(".glb"))
+    self.assertEqual(len(layer_files), 2)
+
+    single_path, reused = self.run_course(single_file=True)
+    self.assertEqual(len(reused), 2)
+    self.assertEqual(sorted(name for name in os.listdir(single_path) if name.endswith(".glb")), ["course.glb"])
+
+    third_path, reused = self.run_course()
+    self.assertEqual(len(reused), 2)
+    self.assertEqual(sorted(name for name in os.listdir(third_path) if name.endswith(".glb")), layer_files)
+
+
+if __name__ == '__main__':
+  unittest.main()